@@ -7,24 +7,61 @@
     # PUT route for full replacements
 
 
-from fastapi import FastAPI, HTTPException, Path, Query, Request  # Import FastAPI framework and utilities
+from fastapi import Depends, FastAPI, HTTPException, Path, Query, Request  # Import FastAPI framework and utilities
 from fastapi.middleware.cors import CORSMiddleware  # Import CORS middleware to allow frontend to call backend from different origin
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder  # Converts Decimal/datetime rows like FastAPI's default responses
 from typing import List, Optional, Dict, Any  # Import type hints for better code clarity
+from datetime import datetime, timezone
 import uvicorn  # Import uvicorn ASGI server to run FastAPI
 import logging
 import os
+import asyncio
+import base64
+import json
+import hashlib
+import hmac
+import numpy as np
 from contextlib import asynccontextmanager
-from fastapi.concurrency import run_in_threadpool
+from functools import lru_cache
 
 # Import business logic from services folder
-from .services.report_service import choose_report  # Import the report selection function
-from .services.chat_services import chat_with_gpt
+from .services.report_service import select_report, reload_report_rules  # Report selection (compiled rule table)
+from .services import report_service  # report_service.report_rules is swapped on reload
+from .services.chat_services import (
+    ask_vet_questions,  # Cached + coalesced AI questions
+    stream_vet_questions,  # Line-by-line streaming variant
+    response_cache,
+    llm_limiter,
+    inflight_requests,
+    llm_traces,
+    llm_breaker,
+    llm_usage,
+    close_llm_client
+)
+from .services.dataset_loader import vet_dataset_status  # Background dataset load state
+from .services.vet_retrieval import start_vet_index_warmup, vet_index_status  # Prompt-grounding index
+from .services.llm_limiter import LLMOverloaded  # Raised when too many AI calls are queued
+from .services.circuit_breaker import CircuitOpen  # Raised while the AI circuit is open
+from .services.llm_usage import BudgetExceeded  # Raised once the daily AI budget is spent
+from .services.ai_cache import PostgresCacheTier  # Optional shared tier for the AI reply cache
+from .services.breed_cache import breed_cache, field_value, CATALOG_QUERY  # In-memory breed catalog (write-through)
+from .services.static_assets import StaticAssets  # Fingerprinted + precompressed frontend files
+from .services.breed_search import BreedSearch, BREED_SEARCH_DEFAULT_LIMIT  # Typeahead index over names/aliases
+from .services.submission_buffer import (  # Write-behind questionnaire inserts
+    SubmissionBuffer, SubmissionBufferFull, SubmissionBufferUnavailable
+)
+from .services.breed_import import detect_format, parse_breed_upload  # Streaming CSV/NDJSON breed validation
+from .services.export_service import encode_rows, prefetch_rows, EXPORT_MEDIA_TYPES  # CSV/NDJSON encoding for exports
+from .services.submission_rollups import SubmissionRollups, ROLLUP_ENABLED  # Hourly analytics rollups
+from .services.rate_limit import (  # Per-client token buckets on expensive routes
+    RateLimiter, RateLimitMiddleware, PostgresBucketStore, parse_rules, RATE_LIMITS, RATE_LIMIT_STORE
+)
 
 # Adjusted imports to use relative paths
 from .schemas.schemas import (
     DogQuestionnaireInput,  # User questionnaire input model
+    DogQuestionnaireBatchInput,  # Many questionnaires in one request
     BreedCreateInput,  # Create new breed input model
     BreedUpdateInput,  # Partial breed update input model
     BreedFullUpdateInput,  # Full breed replacement input model
@@ -35,12 +72,170 @@ from .schemas.schemas import (
 # Import database connection functions from models folder
 from .models.database import (
     get_database_pool,  # Initialize connection pool
+    warm_database_pool,  # Open connections ahead of the first requests
+    register_statement,  # Name fixed queries so each new connection prepares them up front
+    set_statement_warmup,  # Skip warming statements on columns that don't exist yet
     close_database_pool,  # Close connection pool on shutdown
     execute_query,  # Execute INSERT/UPDATE queries
     fetch_one,  # Fetch single row
-    fetch_all  # Fetch multiple rows
+    fetch_all,  # Fetch multiple rows
+    copy_records,  # Bulk-load rows with COPY
+    upsert_via_staging,  # COPY into a staging table, then INSERT ... ON CONFLICT
+    stream_rows,  # Server-side cursor for exports
+    WRITE_RETRYABLE_FAILURES  # Errors a buffered write is retried after (vs. a bad row)
+)
+
+
+# Columns written for each questionnaire submission (tuple order used by the buffer)
+QUESTIONNAIRE_COLUMNS = ["breed_name_AKC", "age_years_preReg", "status_dietRelat_preReg"]
+# Normalized status array written next to the comma-joined text (schemas/MIGRATION_001_status_array_indexes.sql)
+QUESTIONNAIRE_STATUS_ARRAY_COLUMN = "statuses_preReg"
+QUESTIONNAIRE_STATUS_ARRAY_CHECK = """SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'questions_home_dog_4q_v2' AND column_name = 'statuses_prereg'"""
+questionnaire_status_array = False  # Set at startup once the column is known to exist
+
+
+def normalize_statuses(status_string: Optional[str]) -> List[str]:
+    """Comma-joined statuses -> trimmed, lower-case list (the form stored in statuses_preReg)."""
+    return [s.strip().lower() for s in (status_string or "").split(",") if s.strip()]
+
+
+async def detect_questionnaire_schema():
+    """
+    Use the status array column if MIGRATION_001 has added it. No DDL here: ALTER TABLE on
+    this hot table takes an ACCESS EXCLUSIVE lock, and every worker would contend for it.
+    """
+    global questionnaire_status_array
+    questionnaire_status_array = bool(await fetch_one(QUESTIONNAIRE_STATUS_ARRAY_CHECK, use_primary=True))
+    submission_rollups.status_array = questionnaire_status_array
+    # Warm only the rescore query this schema can run
+    set_statement_warmup(QUESTIONNAIRE_REPORT_INPUTS, questionnaire_status_array)
+    set_statement_warmup(QUESTIONNAIRE_REPORT_INPUTS_TEXT, not questionnaire_status_array)
+    if not questionnaire_status_array:
+        print("⚠️  WARNING: statuses_preReg column missing; run schemas/MIGRATION_001_status_array_indexes.sql "
+              "(writing status text only until then)")
+
+
+async def insert_questionnaire_rows(records):
+    """Write a batch of questionnaire tuples to questions_home_dog_4Q_v2 in one COPY."""
+    if not questionnaire_status_array:
+        await copy_records("questions_home_dog_4Q_v2", records, QUESTIONNAIRE_COLUMNS)
+        return
+    await copy_records(
+        "questions_home_dog_4Q_v2",
+        [(*record, normalize_statuses(record[2])) for record in records],
+        QUESTIONNAIRE_COLUMNS + [QUESTIONNAIRE_STATUS_ARRAY_COLUMN]
+    )
+
+
+# Rows the database keeps rejecting (e.g. out of column range) are parked here instead of blocking the buffer
+QUESTIONNAIRE_DEAD_LETTER_DDL = """CREATE TABLE IF NOT EXISTS questionnaire_dead_letters (
+    id BIGSERIAL PRIMARY KEY,
+    record TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER,
+    failed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+)"""
+
+
+async def store_questionnaire_dead_letters(entries):
+    """Persist dead-lettered submissions (record as JSON in QUESTIONNAIRE_COLUMNS order) for later replay."""
+    await copy_records(
+        "questionnaire_dead_letters",
+        [(json.dumps(list(e["record"]), default=str), e["error"], e["attempts"]) for e in entries],
+        ["record", "error", "attempts"]
+    )
+
+
+# Buffers submissions in memory and flushes them in batches (see services/submission_buffer.py)
+submission_buffer = SubmissionBuffer(
+    flush_fn=insert_questionnaire_rows,
+    transient_errors=WRITE_RETRYABLE_FAILURES,
+    dead_letter_fn=store_questionnaire_dead_letters
+)
+
+async def fetch_breed_catalog(query: str):
+    """Catalog loader for breed_cache: reads the primary, since a lagging replica would undo local writes."""
+    return await fetch_all(query, use_primary=True)
+
+
+# Hourly submission counts for the analytics endpoint, refreshed from a watermark
+submission_rollups = SubmissionRollups(fetch_one, fetch_all, execute_query)
+
+SUBMIT_BATCH_MAX_DOGS = int(os.getenv("SUBMIT_BATCH_MAX_DOGS", "1000"))  # Dogs accepted per batch request
+SUBMIT_BATCH_AI_CONCURRENCY = int(os.getenv("SUBMIT_BATCH_AI_CONCURRENCY", "4"))  # AI calls in flight per batch
+
+
+# ==================== Prepared Statements ====================
+# Fixed queries are registered by name and prepared when a pool connection opens, warming
+# asyncpg's per-connection statement cache (models/database.py)
+
+BREED_SEARCH_FIELDS = ['breed_name_AKC', 'dogapi_id']  # Whitelisted WHERE columns for breed routes
+
+register_statement("breed_catalog", CATALOG_QUERY)  # Used by the breed cache on reload
+
+BREED_INSERT = register_statement(
+    "breed_insert",
+    """INSERT INTO breedsAKC_IDs_v3 
+       (breed_name_AKC, breed_group_AKC, breed_life_expect_yrs, 
+        listed_DogDiet_MVP, food_recomm_product, dogapi_id) 
+       VALUES ($1, $2, $3, $4, $5, $6)
+       RETURNING *"""
+)
+
+# One full-replacement statement per search field (the WHERE column can't be a parameter)
+BREED_REPLACE = {
+    field: register_statement(
+        f"breed_replace_by_{field}",
+        f"""UPDATE breedsAKC_IDs_v3 SET 
+           breed_name_AKC = $1, breed_group_AKC = $2, breed_size_categ_AKC = $3,
+           breed_life_expect_yrs = $4, food_recomm_product = $5,
+           listed_DogDiet_MVP = $6, dogapi_id = $7
+           WHERE {field} = $8
+           RETURNING *"""
+    )
+    for field in BREED_SEARCH_FIELDS
+}
+
+
+# Questionnaire export with optional [since, until) window on DateTime_preReg
+QUESTIONNAIRE_EXPORT = register_statement(
+    "questionnaire_export",
+    """SELECT * FROM questions_home_dog_4Q_v2
+       WHERE ($1::timestamp IS NULL OR DateTime_preReg >= $1)
+         AND ($2::timestamp IS NULL OR DateTime_preReg < $2)
+       ORDER BY id_dog_preRegis"""
 )
 
+# Inputs the report rules look at, for rescoring stored submissions
+# (not warmed until detect_questionnaire_schema finds statuses_preReg)
+QUESTIONNAIRE_REPORT_INPUTS = register_statement(
+    "questionnaire_report_inputs",
+    """SELECT q.age_years_preReg, q.statuses_preReg, q.status_dietRelat_preReg, b.breed_size_categ_AKC
+       FROM questions_home_dog_4Q_v2 q
+       LEFT JOIN breedsAKC_IDs_v3 b ON b.breed_name_AKC = q.breed_name_AKC""",
+    warm=False
+)
+# Same, for databases MIGRATION_001 hasn't reached (no statuses_preReg column yet)
+QUESTIONNAIRE_REPORT_INPUTS_TEXT = register_statement(
+    "questionnaire_report_inputs_text",
+    """SELECT q.age_years_preReg, NULL::text[] AS statuses_preReg, q.status_dietRelat_preReg, b.breed_size_categ_AKC
+       FROM questions_home_dog_4Q_v2 q
+       LEFT JOIN breedsAKC_IDs_v3 b ON b.breed_name_AKC = q.breed_name_AKC"""
+)
+
+
+@lru_cache(maxsize=256)
+def build_breed_patch_query(search_field: str, fields: tuple) -> str:
+    """
+    Build (once per shape) the dynamic PATCH query for the given updated fields.
+    Identical shapes yield identical SQL text, so asyncpg's per-connection
+    statement cache reuses the server-side plan instead of re-parsing it.
+    """
+    # Create SET clause with parameterized queries: "field1 = $1, field2 = $2"
+    set_string = ", ".join(f"{key} = ${i+1}" for i, key in enumerate(fields))
+    return f"UPDATE breedsAKC_IDs_v3 SET {set_string} WHERE {search_field} = ${len(fields) + 1} RETURNING *"
+
 # ==================== Application Lifecycle Events ====================
 
 @asynccontextmanager
@@ -52,14 +247,59 @@ async def lifespan(app: FastAPI):
     # Startup
     try:
         await get_database_pool()  # Create database connection pool
+        try:
+            await detect_questionnaire_schema()  # statuses_preReg column for the submission write path
+        except Exception as e:
+            print(f"⚠️  WARNING: statuses_preReg column unavailable (writing status text only): {e}")
+        try:
+            await execute_query(QUESTIONNAIRE_DEAD_LETTER_DDL)
+        except Exception as e:
+            print(f"⚠️  WARNING: questionnaire_dead_letters table unavailable (dead letters kept in memory): {e}")
+        await warm_database_pool()  # Pre-open connections (DB_POOL_WARM_SIZE) and prepare statements
         print("✅ Database connection pool initialized")
     except Exception as e:
         print(f"⚠️  WARNING: Database connection failed: {e}")
         print("   The application will run, but database features will not work.")
+    await submission_buffer.start()  # Background flusher for questionnaire inserts
+    start_vet_index_warmup()  # Load (or build from the vet dataset) the retrieval index in a background thread
+    
+    # Optional shared (Postgres) tier for the AI reply cache, so all workers share replies
+    if os.getenv("AI_CACHE_SHARED", "0") == "1":
+        try:
+            shared_tier = PostgresCacheTier(fetch_one, execute_query)
+            await shared_tier.ensure_table()
+            response_cache.shared = shared_tier
+        except Exception as e:
+            print(f"⚠️  WARNING: Shared AI cache disabled: {e}")
+
+    # Analytics rollups: create the tables and start the periodic watermark refresh
+    if ROLLUP_ENABLED:
+        try:
+            await submission_rollups.ensure_tables()
+            submission_rollups.start()
+        except Exception as e:
+            print(f"⚠️  WARNING: Submission analytics rollups disabled: {e}")
+
+    # Optional shared (Postgres) rate-limit buckets, so limits hold across workers
+    if RATE_LIMIT_STORE == "postgres":
+        try:
+            bucket_store = PostgresBucketStore(fetch_one, execute_query)
+            await bucket_store.ensure_table()
+            rate_limiter.store = bucket_store
+        except Exception as e:
+            print(f"⚠️  WARNING: Shared rate limits disabled (using per-worker memory): {e}")
     
     yield
     
     # Shutdown
+    unwritten = await submission_buffer.stop()  # Flush buffered submissions before the pool goes away
+    await submission_rollups.stop()
+    await close_llm_client()  # Close pooled connections to the LLM API
+    if unwritten:
+        print(f"⚠️  WARNING: {unwritten} acknowledged submissions could not be written "
+              "(dead-lettered or dropped; see the error log)")
+    else:
+        print("✅ Submission buffer flushed")
     await close_database_pool()  # Close all database connections
     print("✅ Database connection pool closed")
 
@@ -72,6 +312,11 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Rate limits per client on expensive routes (RATE_LIMITS); rejects with 429 before any
+# routing, DB or LLM work. Added before CORS so 429 responses still carry CORS headers.
+rate_limiter = RateLimiter(parse_rules(RATE_LIMITS))
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # Configure CORS - allows frontend on different port/domain to access this API
 app.add_middleware(
     CORSMiddleware,  # CORS middleware class
@@ -86,13 +331,35 @@ app.add_middleware(
 frontend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
 public_path = os.path.join(frontend_path, 'public')
 
-# Mount the public directory to serve CSS, JS, and assets
-app.mount("/public", StaticFiles(directory=public_path), name="public")
+# Fingerprinted, precompressed, conditionally served frontend files (services/static_assets.py)
+static_assets = StaticAssets(public_path, os.path.join(frontend_path, 'index.html'))
+
+# Serve CSS, JS, and assets: fingerprinted URLs are cached for a year, plain ones revalidate
+@app.api_route("/public/{asset_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def read_public_asset(request: Request, asset_path: str):
+    return static_assets.response(request, asset_path)
 
-# Serve index.html at the root
-@app.get("/")
-async def read_index():
-    return FileResponse(os.path.join(frontend_path, 'index.html'))
+# Serve index.html at the root (asset links rewritten to their fingerprinted URLs)
+@app.api_route("/", methods=["GET", "HEAD"], include_in_schema=False)
+async def read_index(request: Request):
+    return static_assets.index_response(request)
+
+
+# ==================== Admin Access ====================
+
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")  # Admin routes require header X-Admin-Key; unset disables them
+
+
+def require_admin(request: Request):
+    """
+    Route dependency for admin routes: 503 when no ADMIN_API_KEY is configured,
+    403 unless the X-Admin-Key header matches it (constant-time comparison).
+    """
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=503, detail="Admin routes disabled (ADMIN_API_KEY is not set)")
+    provided = request.headers.get("x-admin-key", "")
+    if not hmac.compare_digest(provided.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Admin key required")
 
 
 # ==================== GET ROUTES - Retrieve Data ====================
@@ -105,8 +372,8 @@ async def get_all_breeds():  # async allows for asynchronous operations (better
     Returns list of all breeds in breedsAKC_IDs_v3 table.
     """
     try:
-        # Fetch all breeds from database
-        breeds = await fetch_all("SELECT * FROM breedsAKC_IDs_v3 ORDER BY breed_name_AKC")
+        # Serve from the in-memory catalog; only a cold or expired cache queries the database
+        breeds = await breed_cache.get_all(fetch_breed_catalog)
         
         return {  # FastAPI automatically converts dict to JSON response
             'success': True,
@@ -118,6 +385,95 @@ async def get_all_breeds():  # async allows for asynchronous operations (better
         raise HTTPException(status_code=500, detail=str(e))  # HTTPException returns error response; 500 = Internal Server Error
 
 
+# Typeahead index over the cached catalog (rebuilt when breed_cache.version changes)
+breed_search = BreedSearch(breed_cache)
+
+
+@app.get("/api/breeds/search")
+async def search_breeds(
+    q: str = Query("", max_length=100, description="What the user has typed so far"),
+    limit: int = Query(BREED_SEARCH_DEFAULT_LIMIT, ge=1, le=50, description="Maximum suggestions")
+):
+    """
+    GET endpoint for breed typeahead. Matches prefixes of breed names, of any word in
+    them ("retr" -> Golden/Labrador Retriever) and of breed_otherNames aliases, then
+    falls back to trigram similarity for typos. Results are ranked exact > prefix >
+    word prefix > fuzzy; `alias` is set when an alias matched rather than the name.
+    """
+    try:
+        results = await breed_search.search(q, limit, fetch_breed_catalog)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'success': True, 'query': q, 'breeds': results}
+
+
+# Columns a v2 listing may project with ?fields= (every breed column the API knows about)
+BREED_FIELDS = list(BreedCreateInput.model_fields.keys())
+
+
+def _encode_cursor(breed_name: str) -> str:
+    return base64.urlsafe_b64encode(breed_name.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> str:
+    return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+
+
+@app.get("/api/v2/breeds")
+async def list_breeds_v2(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum breeds per page"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. breed_name_AKC")
+):
+    """
+    GET endpoint (v2) - paginated, projectable breed listing.
+    Pages are keyset-paginated on breed_name_AKC. Responses carry an ETag derived
+    from the catalog content, so clients re-sending it in If-None-Match get an
+    empty 304 until the catalog changes.
+    """
+    # Validate the projection against known breed columns
+    selected = None
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in BREED_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    try:
+        after = _decode_cursor(cursor) if cursor else None
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    try:
+        page, last_name = await breed_cache.get_page(after, limit, fetch_breed_catalog)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # ETag = catalog content hash + the query that shaped this page
+    query_key = hashlib.blake2b(f"{limit}|{cursor}|{selected}".encode(), digest_size=6).hexdigest()
+    etag = f'W/"{breed_cache.digest}-{query_key}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # no-cache = always revalidate (304s are cheap)
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    if selected:
+        page = [{f: field_value(row, f) for f in selected} for row in page]
+    
+    return JSONResponse(
+        jsonable_encoder({
+            'success': True,
+            'message': f'Retrieved {len(page)} breeds',
+            'breeds': page,
+            'next_cursor': _encode_cursor(last_name) if last_name is not None else None,
+            'version': breed_cache.digest  # Content hash, so every worker reports the same value
+        }),
+        headers=headers
+    )
+
+
 @app.get("/api/breed/{search_field}/{search_value}")  # {variable} in route captures URL segments as function parameters
 async def get_breed(
     search_field: str = Path(..., description="Search by 'breed_name_AKC' or 'dogapi_id'"),  # Path() provides validation and documentation
@@ -130,17 +486,15 @@ async def get_breed(
         search_value: the actual breed name or ID to search for
     """
     # Validate search field - ensure only allowed field names to prevent SQL injection
-    if search_field not in ['breed_name_AKC', 'dogapi_id']:
+    if search_field not in BREED_SEARCH_FIELDS:
         raise HTTPException(  # HTTPException replaces return with error status
             status_code=400,  # 400 = Bad Request (client error)
             detail='Invalid search field. Use breed_name_AKC or dogapi_id'
         )
     
     try:
-        # Fetch specific breed from database using parameterized query
-        # Use $1 placeholder to prevent SQL injection (asyncpg uses $1, $2, etc.)
-        query = f"SELECT * FROM breedsAKC_IDs_v3 WHERE {search_field} = $1"
-        breed = await fetch_one(query, search_value)
+        # Look up the breed in the in-memory catalog (indexed by both search fields)
+        breed = await breed_cache.get_by(search_field, search_value, fetch_breed_catalog)
         
         # Check if breed was found
         if not breed:
@@ -155,10 +509,190 @@ async def get_breed(
             'breed': breed  # Dictionary containing breed data from database
         }
         
+    except HTTPException:
+        raise  # Keep the 404 above instead of turning it into a 500
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # DateTime_preReg is TIMESTAMP (no time zone); compare in UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@app.get("/api/questionnaires/export", dependencies=[Depends(require_admin)])  # Full rows, zipcodes included
+async def export_questionnaires(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    since: Optional[datetime] = Query(None, description="Only rows with DateTime_preReg >= since"),
+    until: Optional[datetime] = Query(None, description="Only rows with DateTime_preReg < until"),
+    chunk_size: int = Query(1000, ge=100, le=10000, description="Rows fetched per cursor round trip")
+):
+    """
+    GET endpoint (admin) to export questionnaire submissions for analytics.
+    Rows are streamed from a server-side cursor in chunks, so memory use
+    stays constant no matter how many rows are exported.
+    """
+    try:
+        chunks = await prefetch_rows(
+            stream_rows(QUESTIONNAIRE_EXPORT, _as_naive_utc(since), _as_naive_utc(until), chunk_size=chunk_size)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        encode_rows(chunks, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="questionnaires.{format}"'}
+    )
+
+
+@app.get("/api/analytics/submissions")
+async def get_submission_analytics(
+    granularity: str = Query("day", pattern="^(hour|day|week|month)$", description="Time bucket size"),
+    since: Optional[datetime] = Query(None, description="Only buckets at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only buckets before this time"),
+    breed: Optional[str] = Query(None, description="Only this breed (breed_name_AKC)"),
+    age_band: Optional[str] = Query(None, description="Only this age band: puppy, junior, adult, senior, geriatric, unknown"),
+    status: Optional[str] = Query(None, description="Only dogs with this status (e.g. allergy)"),
+    group_by: str = Query("", description="Comma-separated breakdown: breed, age_band, status")
+):
+    """
+    GET endpoint for dashboards: submission counts per time bucket, optionally broken
+    down by breed, age band and/or status. Served from the hourly rollup table
+    (services/submission_rollups.py), so the cost depends on the number of buckets
+    returned, not on the number of submissions. Counts include submissions up to
+    `watermark` (refreshed every ROLLUP_REFRESH_SECONDS).
+    With a status breakdown, a dog with several statuses is counted once per status.
+    """
+    dimensions = tuple(d.strip() for d in group_by.split(",") if d.strip())
+    try:
+        rows = await submission_rollups.query(
+            granularity, _as_naive_utc(since), _as_naive_utc(until), breed, age_band, status, dimensions
+        )
+        watermark, refreshed_at = await submission_rollups.watermark()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        'success': True,
+        'granularity': granularity,
+        'group_by': list(dimensions),
+        'watermark': watermark,
+        'refreshed_at': refreshed_at,
+        'buckets': [dict(row) for row in rows]
+    }
+
+
+# ==================== Admin Routes - Operational Stats ====================
+
+@app.get("/api/admin/ai-cache", dependencies=[Depends(require_admin)])
+async def get_ai_cache_stats():
+    """GET endpoint with hit/miss counters for the AI reply cache, limiter and request coalescing."""
+    return {
+        'success': True,
+        'cache': response_cache.snapshot(),
+        'limiter': llm_limiter.snapshot(),
+        'coalescing': inflight_requests.snapshot(),
+        'circuit': llm_breaker.snapshot(),
+        'dataset': vet_dataset_status(),
+        'retrieval': vet_index_status()
+    }
+
+
+@app.get("/api/admin/ai-usage", dependencies=[Depends(require_admin)])
+async def get_ai_usage():
+    """GET endpoint with LLM token, latency and cost counters (totals, rolling window, per model and status profile)."""
+    return {'success': True, **llm_usage.snapshot()}
+
+
+@app.get("/api/admin/submission-buffer", dependencies=[Depends(require_admin)])
+async def get_submission_buffer_stats():
+    """GET endpoint with write-behind buffer counters and the rows it dead-lettered (most recent last)."""
+    return {
+        'success': True,
+        **submission_buffer.snapshot(),
+        'dead_letters': list(submission_buffer.dead_letters)
+    }
+
+
+@app.get("/api/admin/rate-limits", dependencies=[Depends(require_admin)])
+async def get_rate_limit_stats():
+    """GET endpoint with the rate-limit rules and allowed/rejected counters for this worker."""
+    return {'success': True, **rate_limiter.snapshot()}
+
+
+@app.get("/api/admin/report-rules", dependencies=[Depends(require_admin)])
+async def get_report_rules():
+    """GET endpoint describing the compiled report rules (vocabulary, bands, reports)."""
+    return {'success': True, **report_service.report_rules.snapshot()}
+
+
+@app.post("/api/admin/report-rules/reload", dependencies=[Depends(require_admin)])
+async def reload_report_rules_route():
+    """POST endpoint to recompile report_rules.json after editing it (the old rules stay active on error)."""
+    try:
+        engine = reload_report_rules()
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid report rules: {e}")
+    return {'success': True, **engine.snapshot()}
+
+
+@app.get("/api/admin/report-rules/rescore", dependencies=[Depends(require_admin)])
+async def rescore_submissions(
+    chunk_size: int = Query(5000, ge=100, le=50000, description="Rows fetched and scored per batch")
+):
+    """
+    GET endpoint counting how many stored submissions each report would go to under
+    the current rules. Rows are streamed and scored a chunk at a time with the
+    vectorized lookup, so this is cheap to run after changing the rules.
+    """
+    engine = report_service.report_rules
+    counts = np.zeros(len(engine.reports), dtype=np.int64)
+    query = QUESTIONNAIRE_REPORT_INPUTS if questionnaire_status_array else QUESTIONNAIRE_REPORT_INPUTS_TEXT
+    async for rows in stream_rows(query, chunk_size=chunk_size):
+        # Rows not reached by the MIGRATION_001 backfill yet only have the comma-joined text
+        statuses = [
+            r['statuses_prereg'] if r['statuses_prereg'] is not None
+            else normalize_statuses(r['status_dietrelat_prereg'])
+            for r in rows
+        ]
+        ages = [r['age_years_prereg'] for r in rows]
+        sizes = [r['breed_size_categ_akc'] for r in rows]
+        chosen = engine.evaluate_batch(*engine.encode_batch(statuses, ages, sizes))
+        counts += np.bincount(chosen, minlength=len(engine.reports))
+    return {
+        'success': True,
+        'total': int(counts.sum()),
+        'reports': {r['report']: int(n) for r, n in zip(engine.reports, counts)}
+    }
+
+
+@app.post("/api/admin/analytics/refresh", dependencies=[Depends(require_admin)])
+async def refresh_submission_rollups(
+    rebuild: bool = Query(False, description="Recount every submission instead of only new ones")
+):
+    """POST endpoint to fold new submissions into the analytics rollup now (or rebuild it)."""
+    try:
+        result = await (submission_rollups.rebuild() if rebuild else submission_rollups.refresh())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {'success': True, **result, 'stats': submission_rollups.snapshot()}
+
+
+@app.get("/api/admin/ai-traces", dependencies=[Depends(require_admin)])
+async def get_ai_traces(
+    limit: int = Query(50, ge=1, le=1000, description="Most recent traces to return")
+):
+    """GET endpoint with the most recent LLM call traces (newest first) from the bounded trace store."""
+    return {
+        'success': True,
+        'stats': llm_traces.snapshot(),
+        'traces': llm_traces.recent(limit)
+    }
+
+
 # ==================== POST ROUTES - Create New Data ====================
 
 # Preset questions tailored by simple inputs (stub; swap when real logic ready)
@@ -169,6 +703,11 @@ async def get_preset_questions(
     status_dietRelat_preReg: List[str] | None = Query(None, description="Health status list")
 ):
     """Return up to three preset vet questions using provided context."""
+    return {"success": True, "questions": build_preset_questions(breed_name_AKC, age_years_preReg, status_dietRelat_preReg)}
+
+
+def build_preset_questions(breed_name_AKC: str, age_years_preReg: float | None, status_dietRelat_preReg: List[str] | None):
+    """Template questions (no LLM); also served as the fallback when the AI service is unavailable."""
     status_list = status_dietRelat_preReg or []
 
     questions = [
@@ -182,21 +721,17 @@ async def get_preset_questions(
     if age_years_preReg is not None:
         questions.append(f"Is this diet appropriate for a dog around {age_years_preReg} years old?")
 
-    return {"success": True, "questions": questions[:3]}
+    return questions[:3]
 
 
 # AI-generated questions - calls the chat service safely and returns assistant text
-@app.post("/api/questions/ai")
-async def generate_ai_questions(data: DogQuestionnaireInput):
-    """Build a concise user input from questionnaire and call the LLM.
+def _validate_ai_request(data: DogQuestionnaireInput):
+    """Validate and log an AI question request; returns (age, statuses).
 
     Validation and logging:
     - Validate `age_years_preReg` is reasonable (non-negative, not absurdly large).
     - Validate `status_dietRelat_preReg` is a short list of strings.
     - Log only non-sensitive fields (breed, age, statuses) without secrets.
-
-    The AI prompt intentionally ignores the breed for content safety; only age
-    and health statuses are sent to the model as described in `chat_services.py`.
     """
     logger = logging.getLogger(__name__)
 
@@ -219,32 +754,140 @@ async def generate_ai_questions(data: DogQuestionnaireInput):
 
     # Log the incoming (non-sensitive) payload for auditing
     logger.info("AI question request - breed=%s age=%s statuses=%s", data.breed_name_AKC, age, statuses)
+    return age, statuses
+
 
-    # Build concise user input string (ignore breed per policy)
-    statuses_str = ", ".join(statuses) if statuses else "none"
-    user_input = f"Dog age: {age if age is not None else 'unknown'} years. Health status: {statuses_str}."
+@app.post("/api/questions/ai")
+async def generate_ai_questions(data: DogQuestionnaireInput):
+    """Build a concise user input from questionnaire and call the LLM.
 
+    The AI prompt intentionally ignores the breed for content safety; only age
+    and health statuses are sent to the model as described in `chat_services.py`.
+
+    When the AI service is failing (circuit open, deadline exceeded, upstream error)
+    or the daily AI budget (LLM_DAILY_BUDGET_USD) is spent,
+    the preset questions are returned instead with `fallback: true`, so the response
+    time stays bounded by AI_DEADLINE_SECONDS during upstream incidents.
+    """
+    age, statuses = _validate_ai_request(data)
     try:
-        # chat_with_gpt is blocking (calls external SDK); run in threadpool to avoid blocking event loop
-        assistant_text = await run_in_threadpool(chat_with_gpt, user_input)
+        questions, reason = await _ai_questions_or_fallback(data.breed_name_AKC, age, statuses)
+    except LLMOverloaded as e:
+        # Shed load quickly instead of queueing behind slow upstream calls
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
 
-        # Return assistant text as the AI-generated questions. The string may contain
-        # line-separated questions; the frontend can split if a list is preferred.
-        return {"success": True, "questions": assistant_text}
+    # Return assistant text as the AI-generated questions. The string may contain
+    # line-separated questions; the frontend can split if a list is preferred.
+    if reason is None:
+        return {"success": True, "questions": questions, "fallback": False}
+    return {"success": True, "questions": questions, "fallback": True, "fallback_reason": reason}
 
-    except HTTPException:
-        # Re-raise HTTPExceptions raised above
+
+async def _ai_questions_or_fallback(breed_name_AKC: str, age, statuses):
+    """
+    AI questions for one dog, or the preset questions when the AI service is failing.
+    Returns (questions, fallback_reason); the reason is None for an AI reply.
+    LLMOverloaded propagates so callers can choose between 503 and a fallback.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        # Prompt is built from age band + statuses only (breed ignored per policy);
+        # repeat profiles are answered from the response cache without calling the LLM
+        return await ask_vet_questions(age, statuses), None
+    except LLMOverloaded:
         raise
+    except CircuitOpen:
+        reason = "circuit_open"
+    except BudgetExceeded:
+        reason = "budget_exceeded"
+    except asyncio.TimeoutError:
+        logger.warning("AI question request timed out")
+        reason = "timeout"
     except Exception as e:
         # Log the error server-side without exposing internal details to client
         logger.exception("Error generating AI questions: %s", str(e))
-        raise HTTPException(status_code=500, detail="Failed to generate AI questions")
+        reason = "upstream_error"
+
+    # Degrade to the template questions; same newline-separated shape as the AI reply
+    return "\n".join(build_preset_questions(breed_name_AKC, age, statuses)), reason
+
+
+def _sse_event(event: str, payload: Any) -> str:
+    """Format one Server-Sent Events message with a JSON data field."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.post("/api/questions/ai/stream")
+async def stream_ai_questions(data: DogQuestionnaireInput):
+    """Streaming variant of /api/questions/ai using Server-Sent Events.
+
+    Emits one `question` event per completed question line as the model
+    produces it, then a `done` event. If the AI service fails before the first
+    question (circuit open, deadline exceeded, upstream error) the preset
+    questions are streamed instead and `done` carries `fallback: true`. Failures
+    after questions were sent are reported as an `error` event (the HTTP status
+    is already 200).
+    """
+    logger = logging.getLogger(__name__)
+    age, statuses = _validate_ai_request(data)
+
+    async def events():
+        sent = 0
+        reason = None
+        try:
+            async for question in stream_vet_questions(age, statuses):
+                sent += 1
+                yield _sse_event("question", {"text": question})
+            yield _sse_event("done", {"success": True, "fallback": False})
+            return
+        except LLMOverloaded as e:
+            yield _sse_event("error", {"status": 503, "detail": str(e)})
+            return
+        except CircuitOpen:
+            reason = "circuit_open"
+        except BudgetExceeded:
+            reason = "budget_exceeded"
+        except asyncio.TimeoutError:
+            logger.warning("AI question stream timed out")
+            reason = "timeout"
+            if sent:
+                yield _sse_event("error", {"status": 504, "detail": "AI service timed out"})
+        except Exception as e:
+            logger.exception("Error streaming AI questions: %s", str(e))
+            reason = "upstream_error"
+            if sent:
+                yield _sse_event("error", {"status": 500, "detail": "Failed to generate AI questions"})
+
+        if not sent:
+            for question in build_preset_questions(data.breed_name_AKC, age, statuses):
+                yield _sse_event("question", {"text": question})
+            yield _sse_event("done", {"success": True, "fallback": True, "fallback_reason": reason})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # Disable proxy buffering
+    )
+
+async def _breed_size(breed_name: str) -> Optional[str]:
+    """AKC size category for report rules (None when the breed or catalog isn't available)."""
+    try:
+        breed = await breed_cache.get_by("breed_name_AKC", breed_name, fetch_breed_catalog)
+    except Exception:
+        return None  # Size-based rules then see the 'unknown' size band
+    return field_value(breed, "breed_size_categ_AKC") if breed else None
+
 
 @app.post("/api/submit-dog-info")  # @app.post decorator handles POST requests
-async def submit_dog_info(data: DogQuestionnaireInput):  # Pydantic model automatically validates incoming JSON
+async def submit_dog_info(
+    data: DogQuestionnaireInput,  # Pydantic model automatically validates incoming JSON
+    durable: bool = Query(False, description="Wait until the submission is committed to the database")
+):
     """
     POST endpoint - Receives dog questionnaire data from frontend form,
     calls the report selection logic, and returns the appropriate report.
+    The row is written by the submission buffer in a batch; pass ?durable=true
+    to wait for the commit before the response is returned.
     """
     try:
         # Extract validated data from Pydantic model (already parsed and validated)
@@ -253,37 +896,113 @@ async def submit_dog_info(data: DogQuestionnaireInput):  # Pydantic model automa
         status_list = data.status_dietRelat_preReg
         
         # Call the report selection function from services/report_service.py
-        # Pass the status list and breed name to determine which report to use
-        report_message = choose_report(status_list, breed_name)
+        # Pass the statuses, age and breed size to determine which report to use
+        report = select_report(status_list, breed_name, age_years, await _breed_size(breed_name))
 
         # Insert questionnaire data into database
         # Convert status_list array to comma-separated string for storage
         status_string = ','.join(status_list)  # Join list items with commas
         
-        await execute_query(
-            """INSERT INTO questions_home_dog_4Q_v2 
-               (breed_name_AKC, age_years_preReg, status_dietRelat_preReg) 
-               VALUES ($1, $2, $3)""",
-            breed_name,  # $1 parameter
-            age_years,   # $2 parameter
-            status_string  # $3 parameter
-        )
+        # Queue the row for a batched COPY (columns in QUESTIONNAIRE_COLUMNS order)
+        await submission_buffer.submit((breed_name, age_years, status_string), durable=durable)
         
         # Return success response with the selected report message
         return {
             'success': True,
             'message': 'Dog information submitted successfully!',
-            'report': report_message,  # The report selection result
+            'report': report['message'],  # The report selection result
+            'report_name': report['report'],
             'breed': breed_name,
             'age': age_years,
             'statuses': status_list
         }  # FastAPI automatically returns with status code 200
         
+    except (SubmissionBufferFull, SubmissionBufferUnavailable) as e:
+        # Backpressure: buffer is full or can't write, ask the client to retry instead of
+        # acknowledging a row that may never be stored
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         # Catch any errors and return error response
         raise HTTPException(status_code=500, detail=str(e))  # 500 = Internal Server Error
 
 
+@app.post("/api/submit-dog-info/batch")
+async def submit_dog_info_batch(data: DogQuestionnaireBatchInput):
+    """
+    POST endpoint for many dogs in one request (multi-dog households, shelter intake).
+    All reports are chosen in one vectorized pass over the compiled report rules and
+    all rows are written with one COPY before the response is returned. With
+    include_ai_questions, vet questions are generated for each dog with at most
+    SUBMIT_BATCH_AI_CONCURRENCY calls in flight (identical profiles share one call
+    through the AI reply cache); a dog whose AI call fails gets the preset questions.
+    Results are returned in request order.
+    """
+    dogs = data.dogs
+    if len(dogs) > SUBMIT_BATCH_MAX_DOGS:
+        raise HTTPException(status_code=413, detail=f"At most {SUBMIT_BATCH_MAX_DOGS} dogs per batch")
+    if data.include_ai_questions:
+        for i, dog in enumerate(dogs):
+            try:
+                _validate_ai_request(dog)
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail=f"dogs[{i}]: {e.detail}")
+
+    try:
+        # Breed sizes for the report rules, looked up once per distinct breed
+        sizes = {name: await _breed_size(name) for name in {dog.breed_name_AKC for dog in dogs}}
+        engine = report_service.report_rules
+        chosen = engine.evaluate_batch(*engine.encode_batch(
+            [dog.status_dietRelat_preReg for dog in dogs],
+            [dog.age_years_preReg for dog in dogs],
+            [sizes[dog.breed_name_AKC] for dog in dogs],
+        ))
+
+        # One multi-row write for the whole batch (committed before we answer)
+        await insert_questionnaire_rows([
+            (dog.breed_name_AKC, dog.age_years_preReg, ','.join(dog.status_dietRelat_preReg)) for dog in dogs
+        ])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for i, (dog, report_index) in enumerate(zip(dogs, chosen)):
+        report = engine.render(report_index, dog.breed_name_AKC)
+        results.append({
+            'index': i,
+            'report': report['message'],
+            'report_name': report['report'],
+            'breed': dog.breed_name_AKC,
+            'age': dog.age_years_preReg,
+            'statuses': dog.status_dietRelat_preReg
+        })
+
+    if data.include_ai_questions:
+        semaphore = asyncio.Semaphore(SUBMIT_BATCH_AI_CONCURRENCY)
+
+        async def add_questions(result):
+            async with semaphore:
+                try:
+                    questions, reason = await _ai_questions_or_fallback(
+                        result['breed'], result['age'], result['statuses']
+                    )
+                except LLMOverloaded:
+                    reason = "overloaded"
+                    questions = "\n".join(build_preset_questions(result['breed'], result['age'], result['statuses']))
+            result['questions'] = questions
+            result['fallback'] = reason is not None
+            if reason is not None:
+                result['fallback_reason'] = reason
+
+        await asyncio.gather(*(add_questions(result) for result in results))
+
+    return {
+        'success': True,
+        'message': f'{len(results)} dog submissions stored',
+        'count': len(results),
+        'results': results
+    }
+
+
 @app.post("/api/breed", status_code=201)  # status_code=201 sets successful response code (Created)
 async def create_breed(data: BreedCreateInput):  # Pydantic validates required breed_name_AKC automatically
     """
@@ -292,18 +1011,18 @@ async def create_breed(data: BreedCreateInput):  # Pydantic validates required b
     """
     try:
         # Insert new breed into database with all provided fields
-        await execute_query(
-            """INSERT INTO breedsAKC_IDs_v3 
-               (breed_name_AKC, breed_group_AKC, breed_life_expect_yrs, 
-                listed_DogDiet_MVP, food_recomm_product, dogapi_id) 
-               VALUES ($1, $2, $3, $4, $5, $6)""",
+        # RETURNING * gives back the stored row so the breed cache can be patched in place
+        rows = await fetch_all(
+            BREED_INSERT,
             data.breed_name_AKC,
             data.breed_group_AKC,
             data.breed_life_expect_yrs,
             data.listed_DogDiet_MVP,
             data.food_recomm_product,
-            data.dogapi_id
+            data.dogapi_id,
+            use_primary=True  # Writes (and their RETURNING rows) always go to the primary
         )
+        breed_cache.apply_write(None, None, rows)  # Write-through: add the new row to the cache
         
         return {
             'success': True,
@@ -315,6 +1034,47 @@ async def create_breed(data: BreedCreateInput):  # Pydantic validates required b
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/breeds/bulk")
+async def bulk_upsert_breeds(request: Request):
+    """
+    POST endpoint to create or update many breeds in one request.
+    Body is CSV (Content-Type: text/csv, header row + one breed per line) or
+    NDJSON (Content-Type: application/x-ndjson, one JSON object per line), with
+    the same fields as POST /api/breed. Valid rows are COPYed into a staging
+    table and merged on breed_name_AKC; for existing breeds only the columns each
+    row provides are updated (a missing key or empty CSV cell keeps the stored
+    value). Invalid lines are reported, not loaded.
+    """
+    fmt = detect_format(request.headers.get("content-type", ""))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Use Content-Type text/csv or application/x-ndjson")
+    
+    try:
+        parsed = await parse_breed_upload(request.stream(), fmt)  # Validates line by line as the body arrives
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        rows = []
+        if parsed.rows:
+            rows = await upsert_via_staging("breedsAKC_IDs_v3", "breed_name_AKC", parsed.groups())
+        
+        inserted = sum(1 for row in rows if row.pop("inserted_", False))
+        breed_cache.apply_write(None, None, rows)  # Write-through: merge the stored rows into the cache
+        
+        return {
+            'success': not parsed.errors,
+            'message': f'Loaded {len(rows)} breeds ({inserted} new, {len(rows) - inserted} updated)',
+            'received': parsed.received,
+            'inserted': inserted,
+            'updated': len(rows) - inserted,
+            'errors': sorted(parsed.errors, key=lambda err: err['line'])  # Per-line problems; those rows were skipped
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==================== PATCH ROUTES - Partial Update ====================
 
 @app.patch("/api/breed/{search_field}/{search_value}")  # @app.patch decorator handles PATCH requests
@@ -331,7 +1091,7 @@ async def update_breed_partial(
         search_value: the actual breed name or ID to search for
     """
     # Validate search field
-    if search_field not in ['breed_name_AKC', 'dogapi_id']:
+    if search_field not in BREED_SEARCH_FIELDS:
         raise HTTPException(
             status_code=400,
             detail='Invalid search field. Use breed_name_AKC or dogapi_id'
@@ -345,16 +1105,12 @@ async def update_breed_partial(
         raise HTTPException(status_code=400, detail='No update data provided')
     
     try:
-        # Build dynamic UPDATE query for only the fields provided
-        # Create SET clause with parameterized queries
-        set_clauses = [f"{key} = ${i+1}" for i, key in enumerate(update_data.keys())]
-        set_string = ", ".join(set_clauses)  # Join with commas: "field1 = $1, field2 = $2"
-        
-        # Build full UPDATE query with WHERE clause
-        query = f"UPDATE breedsAKC_IDs_v3 SET {set_string} WHERE {search_field} = ${len(update_data) + 1}"
+        # Build dynamic UPDATE query for only the fields provided (cached per field combination)
+        query = build_breed_patch_query(search_field, tuple(update_data.keys()))
         
         # Execute query with values from update_data dict, plus search_value at end
-        await execute_query(query, *update_data.values(), search_value)
+        rows = await fetch_all(query, *update_data.values(), search_value, use_primary=True)
+        breed_cache.apply_write(search_field, search_value, rows)  # Write-through: patch updated rows
         
         # Build list of fields being updated (for response message)
         updated_fields = list(update_data.keys())  # .keys() returns dictionary keys; list() converts to array
@@ -386,7 +1142,7 @@ async def update_breed_full(
         search_value: the actual breed name or ID to search for
     """
     # Validate search field
-    if search_field not in ['breed_name_AKC', 'dogapi_id']:
+    if search_field not in BREED_SEARCH_FIELDS:
         raise HTTPException(
             status_code=400,
             detail='Invalid search field. Use breed_name_AKC or dogapi_id'
@@ -394,12 +1150,8 @@ async def update_breed_full(
     
     try:
         # Replace all breed fields in database with new data
-        await execute_query(
-            f"""UPDATE breedsAKC_IDs_v3 SET 
-               breed_name_AKC = $1, breed_group_AKC = $2, breed_size_categ_AKC = $3,
-               breed_life_expect_yrs = $4, food_recomm_product = $5,
-               listed_DogDiet_MVP = $6, dogapi_id = $7
-               WHERE {search_field} = $8""",
+        rows = await fetch_all(
+            BREED_REPLACE[search_field],
             data.breed_name_AKC,
             data.breed_group_AKC,
             data.breed_size_categ_AKC,
@@ -407,8 +1159,11 @@ async def update_breed_full(
             data.food_recomm_product,
             data.listed_DogDiet_MVP,
             data.dogapi_id,
-            search_value  # WHERE clause parameter
+            search_value,  # WHERE clause parameter
+            use_primary=True
         )
+        # Write-through: drop the old row (PUT may rename the breed) and add the new one
+        breed_cache.apply_write(search_field, search_value, rows)
         
         return {
             'success': True,
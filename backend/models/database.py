@@ -3,9 +3,15 @@
 # Used by: backend/main.py (FastAPI routes import get_database_pool, execute_query, fetch_one, fetch_all)
 
 import os
+import asyncio
+import itertools
+import logging
+import time
 from dotenv import load_dotenv  # Loads environment variables from .env file
 import asyncpg  # Async PostgreSQL driver for FastAPI
-from typing import Optional
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()  # Automatically finds and loads .env in same directory
@@ -17,34 +23,230 @@ DATABASE_URL = os.getenv("DATABASE_URL")  # Retrieves DATABASE_URL from .env fil
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in environment variables. Check your .env file.")
 
+# Server-side prepared statements need a session-mode connection; set DB_PREPARE_STATEMENTS=0
+# when connecting through a transaction-mode pooler (e.g. PgBouncer)
+DB_PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "1") != "0"
+
+# Number of connections to open during startup so the first requests don't pay connect cost
+DB_POOL_WARM_SIZE = int(os.getenv("DB_POOL_WARM_SIZE", "2"))
+
+
+# ==================== Statement Warm-up ====================
+# asyncpg already caches prepared statements per connection (statement_cache_size), so any
+# query is parsed once per connection on first use. Registering a fixed query only moves
+# that first prepare to connection setup, off the request path.
+
+# name -> SQL text for fixed queries; each new pool connection prepares them up front
+STATEMENTS: Dict[str, str] = {}
+# Registered names left out of the warm-up (their tables/columns may not exist yet)
+UNWARMED_STATEMENTS: Set[str] = set()
+
+
+def register_statement(name: str, sql: str, warm: bool = True) -> str:
+    """
+    Register a fixed query under `name` so new connections prepare it during setup.
+    Register before the pool is created (e.g. at import time in main.py);
+    the query helpers accept either the name or the SQL text.
+    
+    Args:
+        warm: False leaves the statement out of the warm-up until set_statement_warmup()
+              enables it, for queries on columns a migration may not have added yet
+              (preparing those would log a failure on every new connection)
+    
+    Returns:
+        The name, so callers can write QUERY = register_statement("...", "...")
+    """
+    STATEMENTS[name] = sql
+    if not warm:
+        UNWARMED_STATEMENTS.add(name)
+    return name
+
+
+def set_statement_warmup(name: str, enabled: bool):
+    """Include (or skip) a registered statement in the warm-up of connections opened from now on."""
+    if enabled:
+        UNWARMED_STATEMENTS.discard(name)
+    else:
+        UNWARMED_STATEMENTS.add(name)
+
+
+def resolve_statement(query: str) -> str:
+    """Map a registered statement name to its SQL text (raw SQL passes through unchanged)."""
+    return STATEMENTS.get(query, query)
+
+
+async def _init_connection(connection):
+    """
+    Pool `init` hook: warm a new connection's statement cache with the registered statements.
+    
+    The statements go into asyncpg's own per-connection statement cache (keyed by SQL
+    text), which survives pool acquire/release; later fetch()/execute() calls with
+    the same text reuse the server-side statement instead of parsing it again.
+    Statements in UNWARMED_STATEMENTS are skipped and prepared on first use instead.
+    """
+    if not DB_PREPARE_STATEMENTS:
+        return
+    # The public prepare() never stores into the statement cache, so a statement prepared
+    # with it would be parsed again by the first fetch(). _prepare(use_cache=True) is the
+    # path fetch() itself takes on a cache miss; it is private, which is why asyncpg is
+    # pinned in requirements.txt. On a version without it, skip warm-up (the cache still
+    # fills on first use) rather than fail every new connection.
+    prepare = getattr(connection, "_prepare", None)
+    if prepare is None:
+        logger.warning("asyncpg %s has no Connection._prepare; statements are prepared on first use",
+                       asyncpg.__version__)
+        return
+    for name, sql in STATEMENTS.items():
+        if name in UNWARMED_STATEMENTS:
+            continue
+        try:
+            await prepare(sql, use_cache=True)
+        except TypeError:
+            logger.warning("Connection._prepare signature changed; statements are prepared on first use")
+            return
+        except Exception as exc:
+            # A bad statement (e.g. table missing) must not make the whole pool unusable
+            logger.warning("Could not prepare statement %s: %s", name, exc)
+
 
 # ==================== Database Connection Pool ====================
 
+# Pool topology comes from the environment so deployments can resize without code changes.
+# Write (primary) pool: execute_query, COPY, and any read that must see its own writes.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+
+# Read pools: one per replica listed in DATABASE_REPLICA_URLS (comma-separated).
+# Without replicas, reads use the primary pool exactly as before.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_READ_POOL_MIN_SIZE = int(os.getenv("DB_READ_POOL_MIN_SIZE", "2"))
+DB_READ_POOL_MAX_SIZE = int(os.getenv("DB_READ_POOL_MAX_SIZE", "10"))
+DB_REPLICA_EJECT_SECONDS = float(os.getenv("DB_REPLICA_EJECT_SECONDS", "30"))  # How long a failed replica sits out
+
+# Errors that mean "this server is unhealthy" (as opposed to a bad query)
+REPLICA_FAILURES = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+)
+
+# Errors after which a write can simply be retried (server unreachable or busy). InterfaceError
+# is left out on purpose: asyncpg's client-side DataError (a value it can't encode) subclasses it
+WRITE_RETRYABLE_FAILURES = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.TooManyConnectionsError,
+)
+
 # Global variable to store connection pool
 db_pool: Optional[asyncpg.Pool] = None
 
 
+async def _create_pool(url: str, min_size: int, max_size: int) -> asyncpg.Pool:
+    return await asyncpg.create_pool(
+        url,  # Connection string from .env
+        min_size=min_size,  # Minimum number of connections in pool
+        max_size=max_size,  # Maximum number of connections in pool
+        command_timeout=DB_COMMAND_TIMEOUT,  # Timeout for queries in seconds
+        statement_cache_size=100 if DB_PREPARE_STATEMENTS else 0,  # 0 = never keep server-side statements
+        init=_init_connection  # Warm each new connection's statement cache
+    )
+
+
+class ReplicaPool:
+    """A read replica's pool plus its health state (ejected replicas are skipped until retry time)."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.pool: Optional[asyncpg.Pool] = None  # Created lazily on first use
+        self.ejected_until = 0.0  # time.monotonic() value; 0 = healthy
+        self._lock = asyncio.Lock()  # Guards lazy pool creation
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def eject(self, exc: Exception):
+        self.ejected_until = time.monotonic() + DB_REPLICA_EJECT_SECONDS
+        logger.warning("Ejecting read replica for %.0fs after error: %s", DB_REPLICA_EJECT_SECONDS, exc)
+
+    async def get_pool(self) -> asyncpg.Pool:
+        if self.pool is None:
+            async with self._lock:
+                if self.pool is None:
+                    self.pool = await _create_pool(self.url, DB_READ_POOL_MIN_SIZE, DB_READ_POOL_MAX_SIZE)
+        return self.pool
+
+
+replica_pools: List[ReplicaPool] = [ReplicaPool(url) for url in DATABASE_REPLICA_URLS]
+_replica_cursor = itertools.count()  # Round-robin position
+
+
 async def get_database_pool() -> asyncpg.Pool:
     """
-    Create and return a connection pool to the database.
+    Create and return the primary (write) connection pool.
     Connection pooling improves performance by reusing database connections.
     """
     global db_pool
     
     if db_pool is None:  # Only create pool if it doesn't exist
-        db_pool = await asyncpg.create_pool(
-            DATABASE_URL,  # Connection string from .env
-            min_size=2,  # Minimum number of connections in pool
-            max_size=10,  # Maximum number of connections in pool
-            command_timeout=60  # Timeout for queries in seconds
-        )
+        db_pool = await _create_pool(DATABASE_URL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
     
     return db_pool
 
 
+async def get_read_pool() -> Tuple[asyncpg.Pool, Optional[ReplicaPool]]:
+    """
+    Pick a pool for a read: the next healthy replica in round-robin order,
+    or the primary when no replica is configured or all are ejected.
+    
+    Returns:
+        (pool, replica) - replica is None when the primary was chosen
+    """
+    count = len(replica_pools)
+    start = next(_replica_cursor)
+    for offset in range(count):
+        replica = replica_pools[(start + offset) % count]
+        if not replica.healthy:
+            continue
+        try:
+            return await replica.get_pool(), replica
+        except REPLICA_FAILURES as exc:
+            replica.eject(exc)
+    return await get_database_pool(), None
+
+
+async def warm_database_pool(size: int = DB_POOL_WARM_SIZE):
+    """
+    Open up to `size` connections per pool now (each runs the `init` hook and prepares
+    the registered statements) so the first requests after a deploy are not slow.
+    """
+    async def _warm(pool: asyncpg.Pool):
+        count = max(0, min(size, pool.get_max_size()))
+        
+        async def _touch():
+            async with pool.acquire() as connection:
+                await connection.execute("SELECT 1")
+        
+        # Acquire concurrently so the pool has to open `count` distinct connections
+        await asyncio.gather(*[_touch() for _ in range(count)])
+    
+    await _warm(await get_database_pool())
+    for replica in replica_pools:
+        try:
+            await _warm(await replica.get_pool())
+        except REPLICA_FAILURES as exc:
+            replica.eject(exc)  # Start without it; reads fall back to other replicas/primary
+
+
 async def close_database_pool():
     """
-    Close the database connection pool.
+    Close the database connection pools (primary and replicas).
     Call this when shutting down the application.
     """
     global db_pool
@@ -52,6 +254,10 @@ async def close_database_pool():
     if db_pool:
         await db_pool.close()  # Close all connections in pool
         db_pool = None
+    for replica in replica_pools:
+        if replica.pool is not None:
+            await replica.pool.close()
+            replica.pool = None
 
 
 # ==================== Database Query Helper Functions ====================
@@ -59,9 +265,10 @@ async def close_database_pool():
 async def execute_query(query: str, *args):
     """
     Execute a query that doesn't return results (INSERT, UPDATE, DELETE).
+    Always runs on the primary.
     
     Args:
-        query: SQL query string
+        query: SQL query string, or the name of a registered statement
         *args: Query parameters (prevents SQL injection)
     
     Returns:
@@ -70,44 +277,182 @@ async def execute_query(query: str, *args):
     pool = await get_database_pool()
     
     async with pool.acquire() as connection:  # Get connection from pool
-        result = await connection.execute(query, *args)  # Execute query with parameters
+        result = await connection.execute(resolve_statement(query), *args)  # Execute query with parameters
         return result
 
 
-async def fetch_one(query: str, *args):
+async def _read(method: str, query: str, args, use_primary: bool):
+    """
+    Run connection.<method>(query, *args) on a read replica (or the primary).
+    If the replica fails at the connection level it is ejected and the read
+    is retried once on the primary; query errors are raised unchanged.
+    """
+    sql = resolve_statement(query)
+    if use_primary:
+        pool, replica = await get_database_pool(), None
+    else:
+        pool, replica = await get_read_pool()
+    
+    try:
+        async with pool.acquire() as connection:
+            return await getattr(connection, method)(sql, *args)
+    except REPLICA_FAILURES as exc:
+        if replica is None:
+            raise
+        replica.eject(exc)
+    
+    pool = await get_database_pool()
+    async with pool.acquire() as connection:
+        return await getattr(connection, method)(sql, *args)
+
+
+async def fetch_one(query: str, *args, use_primary: bool = False):
     """
     Execute a query and return a single row.
     
     Args:
-        query: SQL query string
+        query: SQL query string, or the name of a registered statement
         *args: Query parameters
+        use_primary: read from the primary (needed for read-after-write and for
+                     statements that write, e.g. INSERT ... RETURNING)
     
     Returns:
         Single row as a Record object, or None if no results
     """
-    pool = await get_database_pool()
-    
-    async with pool.acquire() as connection:
-        row = await connection.fetchrow(query, *args)  # Fetch one row
-        return dict(row) if row else None  # Convert to dict for easier use
+    row = await _read("fetchrow", query, args, use_primary)  # Fetch one row
+    return dict(row) if row else None  # Convert to dict for easier use
 
 
-async def fetch_all(query: str, *args):
+async def fetch_all(query: str, *args, use_primary: bool = False):
     """
     Execute a query and return all rows.
     
     Args:
-        query: SQL query string
+        query: SQL query string, or the name of a registered statement
         *args: Query parameters
+        use_primary: read from the primary (needed for read-after-write and for
+                     statements that write, e.g. UPDATE ... RETURNING)
     
     Returns:
         List of rows as dictionaries
     """
+    rows = await _read("fetch", query, args, use_primary)  # Fetch all rows
+    return [dict(row) for row in rows]  # Convert each row to dict
+
+
+async def stream_rows(query: str, *args, chunk_size: int = 1000, use_primary: bool = False):
+    """
+    Async generator yielding lists of rows (asyncpg Records) from a server-side cursor.
+    Only `chunk_size` rows are held in memory at a time, so result size doesn't matter.
+    The connection stays checked out until the generator finishes or is closed.
+    
+    A replica that fails at the connection level is ejected as in _read(); if nothing
+    has been yielded yet the stream restarts on the primary, otherwise the error is
+    raised (restarting would repeat rows the caller already consumed).
+    
+    Args:
+        query: SQL query string, or the name of a registered statement
+        *args: Query parameters
+        chunk_size: rows fetched per round trip
+        use_primary: read from the primary instead of a replica
+    """
+    sql = resolve_statement(query)
+    if use_primary:
+        pool, replica = await get_database_pool(), None
+    else:
+        pool, replica = await get_read_pool()
+    
+    while True:
+        started = False
+        try:
+            async with pool.acquire() as connection:
+                async with connection.transaction(readonly=True):  # Server-side cursors only live inside a transaction
+                    cursor = await connection.cursor(sql, *args)
+                    while True:
+                        rows = await cursor.fetch(chunk_size)
+                        if not rows:
+                            return
+                        started = True
+                        yield rows
+        except REPLICA_FAILURES as exc:
+            if replica is None:
+                raise
+            replica.eject(exc)
+            if started:
+                raise
+        pool, replica = await get_database_pool(), None
+
+
+async def copy_records(table_name: str, records, columns):
+    """
+    Bulk-load rows with PostgreSQL COPY (much faster than one INSERT per row).
+    
+    Args:
+        table_name: target table (unquoted names are folded to lowercase, as Postgres does)
+        records: iterable of tuples, one per row, in `columns` order
+        columns: column names matching each tuple position
+    
+    Returns:
+        COPY status string (e.g. "COPY 42")
+    """
     pool = await get_database_pool()
     
     async with pool.acquire() as connection:
-        rows = await connection.fetch(query, *args)  # Fetch all rows
-        return [dict(row) for row in rows]  # Convert each row to dict
+        # asyncpg quotes identifiers for COPY, so match the lowercase names Postgres
+        # created for the unquoted identifiers in TABLE_CREATE.sql
+        return await connection.copy_records_to_table(
+            table_name.lower(),
+            records=records,
+            columns=[column.lower() for column in columns]
+        )
+
+
+async def upsert_via_staging(table_name: str, key_column: str, groups):
+    """
+    Bulk upsert: COPY rows into a temporary staging table, then merge them into
+    `table_name` with INSERT ... ON CONFLICT (all in one transaction).
+    
+    Args:
+        table_name: target table
+        key_column: unique/primary key column used for ON CONFLICT
+        groups: list of (columns, records) pairs; records are tuples in that group's
+                `columns` order, and only those columns are written (or updated on
+                conflict) for its rows, so columns a row didn't provide keep their value
+    
+    Returns:
+        List of dicts for the inserted/updated rows; each has an extra boolean
+        key "inserted_" (True = new row, False = updated existing row)
+    """
+    # Unquoted identifiers are folded to lowercase by Postgres; COPY quotes them, so match that
+    table = table_name.lower()
+    key = key_column.lower()
+    staging = f"staging_{table}"
+    
+    pool = await get_database_pool()  # Writes always go to the primary
+    results = []
+    
+    async with pool.acquire() as connection:
+        async with connection.transaction():
+            # Temp table lives only for this transaction and is invisible to other sessions
+            await connection.execute(
+                f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            for columns, records in groups:
+                cols = [column.lower() for column in columns]
+                col_list = ", ".join(cols)
+                updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols if c != key)
+                on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+                
+                await connection.execute(f"TRUNCATE {staging}")
+                await connection.copy_records_to_table(staging, records=records, columns=cols)
+                rows = await connection.fetch(
+                    f"""INSERT INTO {table} ({col_list})
+                        SELECT {col_list} FROM {staging}
+                        ON CONFLICT ({key}) {on_conflict}
+                        RETURNING *, (xmax = 0) AS inserted_"""  # xmax = 0 only for freshly inserted rows
+                )
+                results.extend(dict(row) for row in rows)
+    return results
 
 
 # ==================== Example Usage ====================
@@ -0,0 +1,68 @@
+-- Migration 001: normalized status storage + analytics indexes (safe to re-run)
+-- Run with psql in autocommit mode (CREATE INDEX CONCURRENTLY and the batched backfill
+-- commit on their own, so this file must not be wrapped in a transaction):
+--   psql "$DATABASE_URL" -f backend/schemas/MIGRATION_001_status_array_indexes.sql
+-- The API keeps working while this runs: workers check for statuses_preReg at startup
+-- (they never ALTER the table themselves) and start writing it after their next restart,
+-- and readers fall back to the comma-joined status_dietRelat_preReg for rows without it.
+-- Re-run step 2 after restarting the workers to fill rows written in between.
+
+-- 0. Databases created from the original TABLE_CREATE.sql named the breed column
+--    breed_name_AKC_preRegis; the app, the indexes and the rollups all use breed_name_AKC
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM information_schema.columns
+             WHERE table_schema = current_schema() AND table_name = 'questions_home_dog_4q_v2'
+               AND column_name = 'breed_name_akc_preregis')
+     AND NOT EXISTS (SELECT 1 FROM information_schema.columns
+                     WHERE table_schema = current_schema() AND table_name = 'questions_home_dog_4q_v2'
+                       AND column_name = 'breed_name_akc') THEN
+    ALTER TABLE questions_home_dog_4Q_v2 RENAME COLUMN breed_name_AKC_preRegis TO breed_name_AKC;
+  END IF;
+END $$;
+
+-- 1. Statuses as a normalized (trimmed, lower-case) array next to the original text column
+--    Query examples:  WHERE statuses_preReg @> '{allergy}'           (has allergy)
+--                     WHERE statuses_preReg && '{pregnant,elderly}'  (either one)
+ALTER TABLE questions_home_dog_4Q_v2 ADD COLUMN IF NOT EXISTS statuses_preReg TEXT[];
+
+-- 2. Backfill existing rows in batches of 10000 (short transactions, no long table lock)
+DO $$
+DECLARE
+  updated INTEGER;
+BEGIN
+  LOOP
+    UPDATE questions_home_dog_4Q_v2 q
+       SET statuses_preReg = ARRAY(
+             SELECT lower(btrim(s))
+             FROM unnest(string_to_array(q.status_dietRelat_preReg, ',')) AS s
+             WHERE btrim(s) <> ''
+           )  -- NULL/empty text becomes '{}', so every row is visited once
+     WHERE q.id_dog_preRegis IN (
+             SELECT id_dog_preRegis FROM questions_home_dog_4Q_v2
+             WHERE statuses_preReg IS NULL
+             LIMIT 10000
+           );
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    EXIT WHEN updated = 0;
+    COMMIT;
+  END LOOP;
+END $$;
+
+-- 3. Indexes (CONCURRENTLY: inserts keep flowing while they build)
+-- Status membership (@>, &&) for "how many allergy puppies" style queries
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_statuses
+  ON questions_home_dog_4Q_v2 USING GIN (statuses_preReg);
+-- Per-breed counts and per-breed time windows
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_breed_time
+  ON questions_home_dog_4Q_v2 (breed_name_AKC, DateTime_preReg);
+-- Time windows across all breeds (exports with since/until, rollups)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_questions_time
+  ON questions_home_dog_4Q_v2 (DateTime_preReg);
+-- Breed lookups by DogAPI id (GET /api/breed/dogapi_id/..., PATCH/PUT by dogapi_id)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_breeds_dogapi_id
+  ON breedsAKC_IDs_v3 (dogapi_id);
+
+-- Refresh planner statistics for the new column and indexes
+ANALYZE questions_home_dog_4Q_v2;
+ANALYZE breedsAKC_IDs_v3;
@@ -0,0 +1,15 @@
+-- Migration 002: widen questionnaire ages to the 0-30 years the API accepts (safe to re-run)
+-- DECIMAL(3,2) topped out at 9.99, so every submission for a dog aged 10+ failed to insert.
+-- Run with psql:
+--   psql "$DATABASE_URL" -f backend/schemas/MIGRATION_002_widen_age_years.sql
+-- Increasing a numeric's precision with the same scale rewrites no rows, but ALTER TABLE
+-- still takes a brief exclusive lock on questions_home_dog_4Q_v2.
+
+ALTER TABLE questions_home_dog_4Q_v2 ALTER COLUMN age_years_preReg TYPE DECIMAL(4,2);
+
+-- Submissions the buffer dead-lettered for the old limit can be replayed afterwards
+-- (then re-run step 2 of MIGRATION_001 to fill statuses_preReg for them):
+--   INSERT INTO questions_home_dog_4Q_v2 (breed_name_AKC, age_years_preReg, status_dietRelat_preReg)
+--   SELECT r->>0, (r->>1)::DECIMAL(4,2), r->>2
+--   FROM (SELECT record::json AS r FROM questionnaire_dead_letters) d;
+--   DELETE FROM questionnaire_dead_letters;
@@ -20,13 +20,63 @@ VALUES ('Labrador Retriever', 'dogapi_0123456789abcdef012345678901234');
 -- SQL code for creating table that will collect user responses to 3 initial dog questions
 CREATE TABLE questions_home_dog_4Q_v2 (
   id_dog_preRegis SERIAL PRIMARY KEY,  -- Automatically assigned (SERIAL) as KEY for questions_home_dog_4Q_v2 table's "id" field
-  breed_name_AKC_preRegis TEXT,  -- see questions_home_dog_4Q_v2 table's "Breed (name)" field
-  age_years_preReg DECIMAL(3,2), -- 3 = total digits allowed, 2 = digits after decimal; -- see questions_home_dog_4Q_v2 table's "Age (years)" field
+  breed_name_AKC TEXT,  -- see questions_home_dog_4Q_v2 table's "Breed (name)" field
+  age_years_preReg DECIMAL(4,2), -- 4 = total digits allowed, 2 = digits after decimal (existing databases: run MIGRATION_002); -- see questions_home_dog_4Q_v2 table's "Age (years)" field
   status_dietRelat_preReg TEXT, -- none, puppy, elderly, pregnant, allergy, "Other health issues"
+  statuses_preReg TEXT[], -- same statuses, trimmed + lower-case, as an array (indexed; see MIGRATION_001)
   zipcode_preReg TEXT,  -- User's ZIP code (to help tailor recommendations by region/climate if needed in future)
   DateTime_preReg TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Automated current date/time when record created (to handle dups from registration; not modified, since User updates in different form/table)
   -- update DateTime to include time zone: TIMESTAMP **WITH TIME ZONE** DEFAULT CURRENT_TIMESTAMP
   );  
+
+-- Analytics and lookup indexes (existing databases: run MIGRATION_001_status_array_indexes.sql)
+CREATE INDEX idx_questions_statuses ON questions_home_dog_4Q_v2 USING GIN (statuses_preReg);
+CREATE INDEX idx_questions_breed_time ON questions_home_dog_4Q_v2 (breed_name_AKC, DateTime_preReg);
+CREATE INDEX idx_questions_time ON questions_home_dog_4Q_v2 (DateTime_preReg);
+CREATE INDEX idx_breeds_dogapi_id ON breedsAKC_IDs_v3 (dogapi_id);
+ 
+-- Shared tier of the AI reply cache (only used when AI_CACHE_SHARED=1; created automatically at startup)
+CREATE TABLE IF NOT EXISTS ai_question_cache (
+  cache_key TEXT PRIMARY KEY,  -- normalized profile: "<age band>|<sorted statuses>"
+  reply TEXT NOT NULL,  -- assistant text (3 vet questions)
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()  -- entries older than AI_CACHE_TTL_SECONDS are ignored
+);
+ 
+-- Shared rate-limit token buckets (only used when RATE_LIMIT_STORE=postgres; created automatically at startup)
+-- Idle rows can be deleted at any time (a missing row is a full bucket):
+--   DELETE FROM rate_limit_buckets WHERE updated_at < now() - interval '1 day';
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+  bucket_key TEXT PRIMARY KEY,  -- "<METHOD> <path>|<ip:... or key:...>"
+  tokens DOUBLE PRECISION NOT NULL,  -- tokens left after the last admitted request
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()  -- last refill time
+);
+ 
+-- Analytics rollups (created automatically at startup unless ROLLUP_ENABLED=0; see services/submission_rollups.py)
+-- Hourly submission counts per breed, age band and status; status '*' counts every submission once
+CREATE TABLE IF NOT EXISTS submission_rollup_hourly (
+  bucket TIMESTAMP NOT NULL,  -- date_trunc('hour', DateTime_preReg)
+  breed_name_AKC TEXT NOT NULL,
+  age_band TEXT NOT NULL,  -- puppy, junior, adult, senior, geriatric, unknown (ai_cache.AGE_BANDS)
+  status TEXT NOT NULL,  -- one row per status in statuses_preReg, plus '*'
+  submissions BIGINT NOT NULL,
+  PRIMARY KEY (bucket, breed_name_AKC, age_band, status)
+);
+-- Refresh watermark: submissions with DateTime_preReg < watermark are already counted
+CREATE TABLE IF NOT EXISTS submission_rollup_state (
+  name TEXT PRIMARY KEY,
+  watermark TIMESTAMP NOT NULL,
+  refreshed_at TIMESTAMPTZ
+);
+
+-- Questionnaire rows the database kept rejecting; the submission buffer parks them here
+-- (record = JSON array in breed_name_AKC, age_years_preReg, status_dietRelat_preReg order)
+CREATE TABLE IF NOT EXISTS questionnaire_dead_letters (
+  id BIGSERIAL PRIMARY KEY,
+  record TEXT NOT NULL,
+  error TEXT,
+  attempts INTEGER,
+  failed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
  
 --  NOTES ON VARIABLES TO ADD LATER:
 
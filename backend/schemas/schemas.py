@@ -30,6 +30,22 @@ class DogQuestionnaireInput(BaseModel):
     )
 
 
+class DogQuestionnaireBatchInput(BaseModel):
+    """
+    Data model for submitting many dogs at once (multi-dog households, shelter intake).
+    Used in POST /api/submit-dog-info/batch endpoint.
+    """
+    dogs: List[DogQuestionnaireInput] = Field(
+        ...,
+        min_length=1,
+        description="One questionnaire per dog"
+    )
+    include_ai_questions: bool = Field(
+        False,
+        description="Also generate vet questions for each dog (preset questions when the AI is unavailable)"
+    )
+
+
 class BreedCreateInput(BaseModel):
     """
     Data model for creating new breed records.
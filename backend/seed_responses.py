@@ -15,37 +15,37 @@ except ImportError:
     print("⚠️  WARNING: 'openai' module not found. AI generation will be skipped.")
     print("   (This is likely due to the Windows Long Path issue. Move project to a shorter path to fix.)")
     AI_AVAILABLE = False
-    def chat_with_gpt(user_input):
+    async def chat_with_gpt(user_input):
         return "AI not available"
 
 # Test cases to seed
 TEST_CASES = [
     {
-        "breed_name_AKC_preRegis": "Labrador Retriever",
+        "breed_name_AKC": "Labrador Retriever",
         "age_years_preReg": 0.5,
         "status_dietRelat_preReg": ["puppy", "sensitive stomach"],
         "description": "Puppy with sensitive stomach"
     },
     {
-        "breed_name_AKC_preRegis": "Golden Retriever",
+        "breed_name_AKC": "Golden Retriever",
         "age_years_preReg": 12.0,
         "status_dietRelat_preReg": ["arthritis", "overweight"],
         "description": "Senior with arthritis and overweight"
     },
     {
-        "breed_name_AKC_preRegis": "French Bulldog",
+        "breed_name_AKC": "French Bulldog",
         "age_years_preReg": 3.0,
         "status_dietRelat_preReg": ["allergy"],
         "description": "Adult with allergy"
     },
     {
-        "breed_name_AKC_preRegis": "Beagle",
+        "breed_name_AKC": "Beagle",
         "age_years_preReg": 5.0,
         "status_dietRelat_preReg": ["none"],
         "description": "Healthy adult"
     },
     {
-        "breed_name_AKC_preRegis": "German Shepherd",
+        "breed_name_AKC": "German Shepherd",
         "age_years_preReg": 8.0,
         "status_dietRelat_preReg": ["health issues"],
         "description": "Senior with general health issues"
@@ -63,7 +63,7 @@ async def seed_and_test():
     print(f"\nSeeding {len(TEST_CASES)} responses and testing AI adaptation...\n")
 
     for case in TEST_CASES:
-        breed = case["breed_name_AKC_preRegis"]
+        breed = case["breed_name_AKC"]
         age = case["age_years_preReg"]
         statuses = case["status_dietRelat_preReg"]
         status_str = ",".join(statuses)
@@ -89,8 +89,8 @@ async def seed_and_test():
         print(f"AI Prompt Input: '{user_input}'")
         
         try:
-            # Note: chat_with_gpt is synchronous in the current implementation
-            ai_response = chat_with_gpt(user_input)
+            # chat_with_gpt is async (uses the async OpenAI client)
+            ai_response = await chat_with_gpt(user_input)
             print("🤖 AI Response:")
             print(ai_response)
         except Exception as e:
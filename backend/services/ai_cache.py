@@ -0,0 +1,157 @@
+# backend/services/ai_cache.py - Two-tier cache for AI-generated vet questions
+# The AI prompt only depends on the dog's age and health statuses, so replies are cached
+# under a canonical profile key: an in-process LRU with TTL, plus an optional shared
+# Postgres tier so every worker benefits from a reply generated by any of them.
+# Used by: backend/services/chat_services.py (lookup/store), backend/main.py (shared tier, stats)
+
+import os
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+# Tunables (environment overrides)
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1024"))
+AI_CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Life-stage bands used for the cache key (and the prompt): (upper bound in years, label)
+AGE_BANDS = [
+    (1.0, "puppy (under 1 year)"),
+    (2.0, "junior (1-2 years)"),
+    (7.0, "adult (2-7 years)"),
+    (11.0, "senior (7-11 years)"),
+    (float("inf"), "geriatric (11+ years)"),
+]
+
+
+def age_band(age: Optional[float]) -> str:
+    """Map an age in years to its life-stage band label ('unknown' if age is missing)."""
+    if age is None:
+        return "unknown"
+    for upper, label in AGE_BANDS:
+        if age < upper:
+            return label
+    return AGE_BANDS[-1][1]
+
+
+def normalize_profile(age: Optional[float], statuses: Optional[Iterable[str]]) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Canonical form of an AI request: (age band, sorted lower-cased unique statuses).
+    An empty status list is treated the same as ['none'].
+    """
+    cleaned = sorted({s.strip().lower() for s in (statuses or []) if s and s.strip()})
+    return age_band(age), tuple(cleaned) or ("none",)
+
+
+def profile_key(profile: Tuple[str, Tuple[str, ...]]) -> str:
+    """Stable string key for a normalized profile (used by both cache tiers)."""
+    band, statuses = profile
+    return f"{band}|{','.join(statuses)}"
+
+
+class PostgresCacheTier:
+    """
+    Shared cache tier stored in the ai_question_cache table (see schemas/TABLE_CREATE.sql).
+    Takes the database helpers as arguments so this module doesn't import models/.
+    """
+
+    CREATE_SQL = """CREATE TABLE IF NOT EXISTS ai_question_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        reply TEXT NOT NULL,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )"""
+
+    def __init__(self, fetch_one, execute_query, ttl_seconds: float = AI_CACHE_TTL_SECONDS):
+        self.fetch_one = fetch_one
+        self.execute_query = execute_query
+        self.ttl_seconds = ttl_seconds
+
+    async def ensure_table(self):
+        await self.execute_query(self.CREATE_SQL)
+
+    async def get(self, key: str) -> Optional[str]:
+        row = await self.fetch_one(
+            """SELECT reply FROM ai_question_cache
+               WHERE cache_key = $1 AND created_at > now() - make_interval(secs => $2)""",
+            key, self.ttl_seconds
+        )
+        return row["reply"] if row else None
+
+    async def set(self, key: str, reply: str):
+        await self.execute_query(
+            """INSERT INTO ai_question_cache (cache_key, reply) VALUES ($1, $2)
+               ON CONFLICT (cache_key) DO UPDATE SET reply = EXCLUDED.reply, created_at = now()""",
+            key, reply
+        )
+
+
+class ResponseCache:
+    """
+    In-process LRU with per-entry TTL in front of an optional shared tier.
+    Shared-tier errors are counted and ignored: the cache must never fail a request.
+    """
+
+    def __init__(self, max_entries: int = AI_CACHE_MAX_ENTRIES, ttl_seconds: float = AI_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (expires_at, reply)
+        self.shared: Optional[PostgresCacheTier] = None  # Attached at startup when enabled
+        self.stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "stores": 0, "shared_errors": 0}
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, reply = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)  # Mark as most recently used
+        return reply
+
+    def _set_local(self, key: str, reply: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)  # Evict least recently used
+
+    def peek(self, key: str) -> Optional[str]:
+        """Local-tier lookup that doesn't touch the hit/miss counters."""
+        return self._get_local(key)
+
+    async def get(self, key: str) -> Optional[str]:
+        reply = self._get_local(key)
+        if reply is not None:
+            self.stats["local_hits"] += 1
+            return reply
+        if self.shared is not None:
+            try:
+                reply = await self.shared.get(key)
+            except Exception:
+                self.stats["shared_errors"] += 1
+                reply = None
+            if reply is not None:
+                self.stats["shared_hits"] += 1
+                self._set_local(key, reply)  # Promote to the local tier
+                return reply
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, reply: str):
+        self.stats["stores"] += 1
+        self._set_local(key, reply)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, reply)
+            except Exception:
+                self.stats["shared_errors"] += 1
+
+    def snapshot(self) -> dict:
+        """Counters plus derived hit ratio, for the admin endpoint."""
+        lookups = self.stats["local_hits"] + self.stats["shared_hits"] + self.stats["misses"]
+        hits = self.stats["local_hits"] + self.stats["shared_hits"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+            "shared_tier": self.shared is not None,
+        }
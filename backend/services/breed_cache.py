@@ -0,0 +1,167 @@
+# backend/services/breed_cache.py - In-process cache of the breedsAKC_IDs_v3 catalog
+# The breed table is small and changes rarely, so the whole table is held in memory
+# and indexed by both lookup fields used by the /api/breed routes.
+# Used by: backend/main.py (GET routes read from it; POST/PATCH/PUT routes patch it after writing)
+
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Fields the breed routes are allowed to search by (same whitelist as main.py)
+INDEXED_FIELDS = ("breed_name_AKC", "dogapi_id")
+
+# Safety net for multi-worker deployments: other workers' writes are not seen here,
+# so the catalog is re-read after this many seconds even without a local write.
+BREED_CACHE_TTL_SECONDS = float(os.getenv("BREED_CACHE_TTL_SECONDS", "300"))
+
+CATALOG_QUERY = "SELECT * FROM breedsAKC_IDs_v3 ORDER BY breed_name_AKC"
+
+
+def field_value(row: Dict[str, Any], field: str) -> Any:
+    """
+    Read `field` from a row dict. Postgres folds unquoted column names to lowercase,
+    so rows may carry 'breed_name_akc' rather than 'breed_name_AKC'.
+    """
+    if field in row:
+        return row[field]
+    return row.get(field.lower())
+
+
+class BreedCatalogCache:
+    """
+    Holds every breed row in memory, sorted by breed_name_AKC, with a dict index
+    per searchable field. Reads never touch the database once loaded; concurrent
+    misses share a single reload so a page-load spike costs at most one query.
+    """
+
+    def __init__(self, ttl_seconds: float = BREED_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._rows: List[Dict[str, Any]] = []  # Sorted list served by GET /api/breeds
+        self._index: Dict[str, Dict[Any, Dict[str, Any]]] = {field: {} for field in INDEXED_FIELDS}
+        self._names: List[str] = []  # breed_name_AKC of each row in _rows order (for keyset paging)
+        self._loaded_at: Optional[float] = None  # None means "not loaded / invalidated"
+        self._lock = asyncio.Lock()  # Serializes reloads (single-flight)
+        self.version = 0  # Bumped whenever the catalog content changes (per worker; see digest)
+        self._writes = 0  # Bumped by apply_write; lets a reload detect a write that raced it
+        self.digest = ""  # Content hash of the catalog; identical across workers with the same data
+
+    # ---------- internal helpers ----------
+
+    def _is_fresh(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return (time.monotonic() - self._loaded_at) < self.ttl_seconds
+
+    def _rebuild(self, rows: List[Dict[str, Any]]):
+        """Replace the sorted row list and both indexes from `rows`."""
+        rows = sorted(rows, key=lambda r: field_value(r, "breed_name_AKC") or "")
+        # Hash the content so a TTL reload of unchanged data keeps the same version/ETag
+        digest = hashlib.blake2b(
+            json.dumps(rows, sort_keys=True, default=str).encode(), digest_size=12
+        ).hexdigest()
+        index = {field: {} for field in INDEXED_FIELDS}
+        for row in rows:
+            for field in INDEXED_FIELDS:
+                value = field_value(row, field)
+                # Keep the first row per key, matching fetch_one() semantics
+                if value is not None and value not in index[field]:
+                    index[field][value] = row
+        self._rows = rows
+        self._index = index
+        self._names = [field_value(r, "breed_name_AKC") or "" for r in rows]
+        if digest != self.digest:
+            self.digest = digest
+            self.version += 1
+
+    async def _ensure_loaded(self, loader: Callable[[str], Awaitable[List[Dict[str, Any]]]]):
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():  # Another request reloaded while we waited
+                return
+            writes = self._writes
+            rows = await loader(CATALOG_QUERY)
+            if self._writes != writes:
+                # A write was applied while the query ran, so its snapshot may predate it.
+                # The write committed before apply_write ran, so a second read sees it
+                # (the loader reads the primary; a lagging replica could still miss it).
+                writes = self._writes
+                rows = await loader(CATALOG_QUERY)
+            if self._writes == writes:
+                self._rebuild(rows)
+                self._loaded_at = time.monotonic()
+            elif not self._rows:
+                self._rebuild(rows)  # Serve something, but stay stale so the next read reloads
+            # Otherwise keep the patched catalog; it is still stale, so the next read reloads
+
+    # ---------- read API ----------
+
+    async def get_all(self, loader) -> List[Dict[str, Any]]:
+        """
+        Return all breed rows ordered by breed_name_AKC.
+
+        Args:
+            loader: async function taking a SQL string and returning a list of dicts, read
+                    from the primary (main.fetch_breed_catalog); only called on a cache miss
+        """
+        await self._ensure_loaded(loader)
+        return self._rows
+
+    async def get_page(self, after: Optional[str], limit: int, loader) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset pagination over breed_name_AKC.
+
+        Args:
+            after: return rows whose breed_name_AKC sorts after this value (None = from the start)
+            limit: maximum number of rows to return
+
+        Returns:
+            (rows, next_after) - next_after is the last name on this page, or None on the last page
+        """
+        await self._ensure_loaded(loader)
+        start = 0 if after is None else bisect.bisect_right(self._names, after)
+        page = self._rows[start:start + limit]
+        has_more = start + limit < len(self._rows)
+        return page, (self._names[start + limit - 1] if has_more and page else None)
+
+    async def get_by(self, search_field: str, search_value: Any, loader) -> Optional[Dict[str, Any]]:
+        """Return the breed row whose `search_field` equals `search_value`, or None."""
+        if search_field not in INDEXED_FIELDS:
+            raise ValueError(f"Unsupported search field: {search_field}")
+        await self._ensure_loaded(loader)
+        return self._index[search_field].get(search_value)
+
+    # ---------- write-through API ----------
+
+    def invalidate(self):
+        """Drop the cached catalog; the next read reloads it from the database."""
+        self._loaded_at = None
+
+    def apply_write(self, search_field: Optional[str], search_value: Any, rows: List[Dict[str, Any]]):
+        """
+        Patch the cache after a successful write.
+
+        Args:
+            search_field/search_value: identify the row(s) that existed before the write
+                                       (None for inserts); they are removed first so
+                                       renames via PUT don't leave stale entries
+            rows: the row(s) as stored after the write (from RETURNING *)
+        """
+        self._writes += 1
+        if self._loaded_at is None:
+            return  # Nothing cached yet; the next read loads fresh data anyway
+
+        kept = self._rows
+        if search_field is not None:
+            kept = [r for r in kept if field_value(r, search_field) != search_value]
+        new_names = {field_value(r, "breed_name_AKC") for r in rows}
+        kept = [r for r in kept if field_value(r, "breed_name_AKC") not in new_names]
+        self._rebuild(kept + [dict(r) for r in rows])
+
+
+# Shared instance for the application process
+breed_cache = BreedCatalogCache()
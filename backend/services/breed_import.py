@@ -0,0 +1,179 @@
+# backend/services/breed_import.py - Streaming parser/validator for bulk breed uploads
+# Turns a CSV or NDJSON request body into validated BreedCreateInput rows, one line at a time,
+# collecting per-line errors instead of failing the whole upload.
+# Used by: backend/main.py (POST /api/breeds/bulk)
+
+import csv
+import json
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ..schemas.schemas import BreedCreateInput
+
+# Upper bound on rows per upload, so one request can't hold unbounded data in memory
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+
+BREED_FIELDS = list(BreedCreateInput.model_fields.keys())
+
+
+def detect_format(content_type: str) -> Optional[str]:
+    """Map a Content-Type header to 'csv' or 'ndjson' (None if unsupported)."""
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed body into decoded text lines without buffering the whole body."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            yield line.rstrip(b"\r").decode("utf-8-sig")
+    if pending.strip():
+        yield pending.rstrip(b"\r").decode("utf-8-sig")
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors())
+
+
+class BreedImportResult:
+    """Validated rows (last occurrence of each breed wins) plus per-line errors."""
+
+    def __init__(self):
+        # breed_name_AKC -> (line, model, columns the line actually provided, in BREED_FIELDS order)
+        self.rows: Dict[str, Tuple[int, BreedCreateInput, Tuple[str, ...]]] = {}
+        self.errors: List[Dict[str, Any]] = []
+        self.received = 0
+
+    def add(self, line_no: int, raw: Dict[str, Any]):
+        self.received += 1
+        # CSV has no null; treat empty cells as "not provided" (the stored value is kept)
+        raw = {k: v for k, v in raw.items() if v != ""}
+        unknown = [k for k in raw if k not in BREED_FIELDS]
+        if unknown:
+            self.errors.append({"line": line_no, "error": f"Unknown fields: {', '.join(unknown)}"})
+            return
+        try:
+            model = BreedCreateInput(**raw)
+        except ValidationError as exc:
+            self.errors.append({"line": line_no, "error": _format_validation_error(exc)})
+            return
+        provided = tuple(f for f in BREED_FIELDS if f in raw)
+        previous = self.rows.get(model.breed_name_AKC)
+        if previous is not None:
+            # ON CONFLICT can't touch the same row twice in one statement; keep the later line
+            self.errors.append({"line": previous[0], "error": f"Superseded by line {line_no} (duplicate breed_name_AKC)"})
+        self.rows[model.breed_name_AKC] = (line_no, model, provided)
+
+    def groups(self) -> List[Tuple[List[str], List[tuple]]]:
+        """
+        (columns, records) per distinct set of provided columns, ready for COPY. Rows are
+        grouped so an upsert only overwrites the columns each row actually carried.
+        """
+        grouped: Dict[Tuple[str, ...], List[tuple]] = {}
+        for _, model, provided in self.rows.values():
+            grouped.setdefault(provided, []).append(tuple(getattr(model, c) for c in provided))
+        return [(list(columns), records) for columns, records in grouped.items()]
+
+
+class _LineFeed:
+    """
+    Iterator a single csv.reader pulls from while the body streams in. Lines are pushed
+    only until they hold a complete record (balanced quotes), so the reader never runs dry
+    in the middle of a quoted field that spans lines.
+    """
+
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+        self.quotes = 0  # Quote characters pushed since the last complete record
+
+    def push(self, line: str):
+        self.lines.append(line + "\n")
+        self.quotes += line.count('"')
+
+    @property
+    def record_ready(self) -> bool:
+        # Doubled quotes ("") inside a quoted field keep the count even
+        return bool(self.lines) and self.quotes % 2 == 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def parse_breed_upload(chunks: AsyncIterator[bytes], fmt: str) -> BreedImportResult:
+    """
+    Validate an uploaded CSV (header row + one breed per record; quoted fields may span
+    lines) or NDJSON (one JSON object per line) body against BreedCreateInput.
+
+    Raises:
+        ValueError: if the upload has more than BULK_IMPORT_MAX_ROWS rows or no CSV header
+    """
+    result = BreedImportResult()
+    header: Optional[List[str]] = None
+    feed = _LineFeed()
+    reader = csv.reader(feed)  # One reader for the whole body (quoted fields may contain newlines)
+    line_no = 0
+    record_line = 0  # First line of the CSV record being collected
+
+    def add_csv_record(values: List[str]):
+        nonlocal header
+        if header is None:
+            header = [h.strip() for h in values]
+            return
+        if len(values) != len(header):
+            result.received += 1
+            result.errors.append({"line": record_line, "error": f"Expected {len(header)} columns, got {len(values)}"})
+            return
+        result.add(record_line, dict(zip(header, values)))
+
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if fmt == "csv" and feed.lines:
+            feed.push(line)  # Continuation of a quoted field that spans lines
+        elif not line.strip():
+            continue
+        elif result.received >= BULK_IMPORT_MAX_ROWS:
+            raise ValueError(f"Too many rows; maximum {BULK_IMPORT_MAX_ROWS} per upload")
+        elif fmt == "csv":
+            record_line = line_no
+            feed.push(line)
+        else:
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as exc:
+                result.received += 1
+                result.errors.append({"line": line_no, "error": f"Invalid JSON: {exc.msg}"})
+                continue
+            if not isinstance(raw, dict):
+                result.received += 1
+                result.errors.append({"line": line_no, "error": "Each line must be a JSON object"})
+                continue
+            result.add(line_no, raw)
+            continue
+
+        if feed.record_ready:
+            feed.quotes = 0
+            add_csv_record(next(reader))
+
+    if feed.lines:
+        # Body ended inside a quoted field
+        result.received += 1
+        result.errors.append({"line": record_line, "error": "Unterminated quoted field"})
+
+    if fmt == "csv" and header is None:
+        raise ValueError("CSV upload needs a header row")
+    return result
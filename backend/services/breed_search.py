@@ -0,0 +1,168 @@
+# backend/services/breed_search.py - Typeahead search over breed names and aliases
+# Built from the breed cache rows: every breed name and each semicolon-separated alias in
+# breed_otherNames becomes a search entry. A prefix trie answers "lab" / "golden re" / "retr"
+# (prefixes of the whole name or of any word) by walking len(query) nodes, and trigram
+# overlap catches typos ("labrdor"). The index is rebuilt when breed_cache.version changes.
+# Used by: backend/main.py (GET /api/breeds/search)
+
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from .breed_cache import field_value
+
+BREED_SEARCH_DEFAULT_LIMIT = int(os.getenv("BREED_SEARCH_DEFAULT_LIMIT", "8"))
+BREED_SEARCH_MIN_SIMILARITY = float(os.getenv("BREED_SEARCH_MIN_SIMILARITY", "0.3"))  # Trigram score cut-off
+TRIE_NODE_CAP = 32  # Best entries kept per trie node (more than any page of suggestions)
+
+# Match kinds, best first (ties broken by shorter text, names before aliases, then alphabetically)
+EXACT, NAME_PREFIX, WORD_PREFIX, FUZZY = 0, 1, 2, 3
+MATCH_NAMES = {EXACT: "exact", NAME_PREFIX: "prefix", WORD_PREFIX: "word_prefix", FUZZY: "fuzzy"}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip accents and punctuation, collapse spaces ("Shih-Tzu" -> "shih tzu")."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of a normalized string, padded so short words still produce some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class BreedSearchIndex:
+    """
+    Immutable search structures for one catalog version.
+
+    entries[i] = (breed_name_AKC, matched text, is_alias); the trie maps each normalized
+    prefix to the best TRIE_NODE_CAP (rank key, entry id) pairs below it.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.entries: List[Tuple[str, str, bool]] = []
+        keys: List[str] = []
+        for row in rows:
+            name = field_value(row, "breed_name_AKC")
+            if not name:
+                continue
+            aliases = [a.strip() for a in (field_value(row, "breed_otherNames") or "").split(";")]
+            for text, is_alias in [(name, False)] + [(a, True) for a in aliases if a]:
+                key = normalize(text)
+                if key:
+                    self.entries.append((name, text, is_alias))
+                    keys.append(key)
+        self.keys = keys
+
+        # Trie as nested dicts; each node's "" slot holds its ranked candidate list
+        self.trie: Dict[str, Any] = {}
+        for entry_id, key in enumerate(keys):
+            starts = [0] + [i + 1 for i, ch in enumerate(key) if ch == " "]
+            for word_index, start in enumerate(starts):
+                kind = NAME_PREFIX if word_index == 0 else WORD_PREFIX
+                # Whole-key prefixes first; among them the shortest (an exact match comes first)
+                rank = (kind, len(key), self.entries[entry_id][2], key)
+                node = self.trie
+                for ch in key[start:]:
+                    node = node.setdefault(ch, {"": []})
+                    node[""].append((rank, entry_id))
+        self._cap(self.trie)
+
+        # Trigram postings for fuzzy matching
+        self.grams = [trigrams(key) for key in keys]
+        self.postings: Dict[str, List[int]] = {}
+        for entry_id, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(entry_id)
+
+    def _cap(self, node: Dict[str, Any]):
+        """Sort and trim every node's candidate list once, so lookups just slice it."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for ch, child in current.items():
+                if ch == "":
+                    continue
+                candidates = sorted(set(child[""]))
+                child[""] = candidates[:TRIE_NODE_CAP]
+                stack.append(child)
+
+    def _prefix(self, query: str) -> List[Tuple[tuple, int]]:
+        node = self.trie
+        for ch in query:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node[""]
+
+    def _fuzzy(self, query: str) -> List[Tuple[float, int]]:
+        """(similarity, entry id) for entries sharing enough trigrams with the query (Jaccard)."""
+        query_grams = trigrams(query)
+        shared = Counter(entry_id for gram in query_grams for entry_id in self.postings.get(gram, ()))
+        scored = []
+        for entry_id, common in shared.items():
+            score = common / (len(query_grams) + len(self.grams[entry_id]) - common)
+            if score >= BREED_SEARCH_MIN_SIMILARITY:
+                scored.append((score, entry_id))
+        scored.sort(key=lambda item: (-item[0], len(self.keys[item[1]])))
+        return scored
+
+    def search(self, query: str, limit: int = BREED_SEARCH_DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """Top `limit` breeds for `query`; one result per breed, best match first."""
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+        results: List[Dict[str, Any]] = []
+        seen = set()
+
+        def add(entry_id: int, kind: int, score: float) -> bool:
+            name, text, is_alias = self.entries[entry_id]
+            if name in seen:
+                return False
+            seen.add(name)
+            result = {"breed_name_AKC": name, "match": MATCH_NAMES[kind], "score": round(score, 3)}
+            if is_alias:
+                result["alias"] = text
+            results.append(result)
+            return len(results) >= limit
+
+        for rank, entry_id in self._prefix(query):
+            kind = EXACT if self.keys[entry_id] == query else rank[0]
+            if add(entry_id, kind, 1.0 if kind == EXACT else len(query) / len(self.keys[entry_id])):
+                break
+        if len(results) < limit and len(query) >= 3:
+            for score, entry_id in self._fuzzy(query):
+                if add(entry_id, FUZZY, score):
+                    break
+        return results
+
+
+class BreedSearch:
+    """Holds the index for the current breed catalog version and rebuilds it on change."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._index: Optional[BreedSearchIndex] = None
+        self.rebuilds = 0
+
+    async def search(self, query: str, limit: int, loader) -> List[Dict[str, Any]]:
+        rows = await self.cache.get_all(loader)  # Reloads the catalog when it is stale
+        index = self._index
+        if index is None or index.version != self.cache.version:
+            index = self._index = BreedSearchIndex(rows, self.cache.version)
+            self.rebuilds += 1
+        return index.search(query, limit)
+
+    def snapshot(self) -> dict:
+        index = self._index
+        return {
+            "version": index.version if index else None,
+            "entries": len(index.entries) if index else 0,
+            "rebuilds": self.rebuilds,
+        }
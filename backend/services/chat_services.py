@@ -1,19 +1,30 @@
 from dotenv import load_dotenv  # loads .env for local development
 import os
-import openai  # Switched back to OpenAI library
+import asyncio
+import time
 import logging
+from typing import Dict, List, Optional
+
+from .ai_cache import ResponseCache, normalize_profile, profile_key
+from .llm_limiter import ConcurrencyLimiter, LLMOverloaded, LLM_MAX_CONCURRENCY
+from .single_flight import SingleFlight
+from .llm_trace import TraceStore
+from .circuit_breaker import CircuitBreaker
+from .llm_providers import LLM_PROVIDER, create_provider
+from .llm_usage import BudgetExceeded, UsageMeter
 
 # NOTE: This module wraps the LLM client for the app. Keep logic small and
 # focused: build a minimal prompt, call the model, and return the assistant text.
 
-# Try to import dataset loader helper (optional). If present, load dataset for use in chat logic.
-# The dataset loader is optional because not all deployments will need or want
-# the additional dataset dependency or memory usage.
+# Try to import the retrieval helper (optional). If present, passages from the vet dataset
+# relevant to the dog's profile are added to the prompt as background context.
+# Retrieval is optional because not all deployments will need or want
+# the additional dataset dependency or index files.
 try:
-    from .dataset_loader import get_vet_dataset
+    from .vet_retrieval import retrieve_passages
 except Exception:
-    # dataset_loader may not exist in some environments; fall back gracefully.
-    get_vet_dataset = None
+    # vet_retrieval (or numpy) may not exist in some environments; fall back gracefully.
+    retrieve_passages = None
 
 # Load environment variables from an .env file for local development.
 # In production, prefer real environment variables or a secret manager.
@@ -24,14 +35,38 @@ if not os.getenv("OPENAI_API_KEY") and os.path.exists("backend/.env"):
     load_dotenv("backend/.env")
 
 # Accept `OPENAI_API_KEY` (preferred) or `API_KEY`.
-# Fail fast with a clear error if no key is present to help developers notice missing config.
+# Only required by the openai provider (LLM_PROVIDER=fake runs without a key).
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or os.getenv("API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("OpenAI API key not found. Set OPENAI_API_KEY in .env or environment variables.")
 
-# Initialize OpenAI client with the environment key.
+# Per-call budget for one completion (seconds) and SDK-level retries on transient errors
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# End-to-end budget for generating one reply (queue wait + call + retries); past it the
+# request gives up and the API serves preset questions instead
+AI_DEADLINE_SECONDS = float(os.getenv("AI_DEADLINE_SECONDS", "8"))
+
+# LLM backend selected by LLM_PROVIDER (see llm_providers.py): the OpenAI API by default,
+# or a deterministic local fake for offline load testing.
 # Switched back to OpenAI because a Google API key was not available.
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+llm_provider = create_provider(
+    LLM_PROVIDER,
+    api_key=OPENAI_API_KEY,
+    timeout=LLM_TIMEOUT_SECONDS,
+    max_retries=LLM_MAX_RETRIES,
+    max_connections=LLM_MAX_CONCURRENCY,
+)
+
+# Bounds in-flight LLM calls and the queue waiting for them (raises LLMOverloaded when full)
+llm_limiter = ConcurrencyLimiter()
+
+# Fails fast with CircuitOpen after repeated upstream failures/timeouts (see circuit_breaker.py).
+# LLMOverloaded is local load shedding, not an upstream failure, so it doesn't trip the circuit.
+llm_breaker = CircuitBreaker()
+
+
+async def close_llm_client():
+    """Close pooled LLM connections (call from FastAPI lifespan shutdown)."""
+    await llm_provider.close()
 
 # System prompt: guides assistant behavior for every request. Keep concise and
 # explicit about disallowed behavior (no medical advice, diagnoses, or product
@@ -47,53 +82,286 @@ SYSTEM_PROMPT = (
     "Draw upon reliable veterinary knowledge."
 )
 
-# Maintain conversation history structure for OpenAI chat completions
-conversation_history = [
-    {
-        "role": "system",
-        "content": SYSTEM_PROMPT
-    }
-]
-
-def chat_with_gpt(user_input: str):
-        """Send `user_input` (age + health statuses) to the LLM and return the assistant reply.
-
-        Design goals / safety:
-        - Only a short, focused conversation is sent (system + current user input)
-            to avoid leaking history and limit token usage.
-        - Use conservative model parameters (low temperature) so output
-            is deterministic and concise for medical-adjacent content.
-
-        Returns:
-                assistant_text (str): the raw assistant response (expected to contain
-                three short questions). Callers may split into lines if needed.
-        """
-        
-        # Ensure dataset is loaded (lazy load) to provide context if needed in future
-        if get_vet_dataset:
-             _ = get_vet_dataset()
-
-        # Build a minimal messages payload: system prompt + current user input.
-        # Keeps the request focused and reduces the chance of leaking other data.
-        messages = [conversation_history[0], {"role": "user", "content": user_input}]
-
-        # Call the OpenAI chat completion endpoint.
-        # Using gpt-4o-mini as a reliable, language-oriented source.
-        response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.3, # Low temperature for more deterministic/reliable output
-                frequency_penalty=0.7,
-                presence_penalty=0.25,
-                max_tokens=200,
-        )
-
-        # Extract assistant text from response.
-        assistant_text = response.choices[0].message.content
-
-        # Append assistant reply to in-memory history for debugging/inspection only.
-        conversation_history.append({"role": "assistant", "content": assistant_text})
-
-        # Return the assistant's text (the generated 3 vet questions).
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Introduces retrieved dataset passages; they inform the questions but must not be quoted as advice
+RETRIEVAL_PREAMBLE = (
+    "Background excerpts from a veterinary Q&A dataset, for context only. Use them to make the"
+    " questions more relevant; do not quote them or turn them into advice:\n"
+)
+
+# Recent calls (prompt hash, latency, tokens, reply) in a bounded ring buffer for
+# debugging; replaces the old conversation_history list, which grew without limit.
+llm_traces = TraceStore()
+
+# Token/latency/cost counters per model and status profile, plus the optional daily budget
+llm_usage = UsageMeter()
+
+# Model parameters shared by the blocking and streaming calls (passed to the provider).
+# Using gpt-4o-mini as a reliable, language-oriented source.
+COMPLETION_PARAMS = dict(
+    model="gpt-4o-mini",
+    temperature=0.3, # Low temperature for more deterministic/reliable output
+    frequency_penalty=0.7,
+    presence_penalty=0.25,
+    max_tokens=200,
+)
+
+# Model label for traces, e.g. "openai/gpt-4o-mini" or "fake/gpt-4o-mini"
+TRACE_MODEL = f"{llm_provider.name}/{COMPLETION_PARAMS['model']}"
+
+
+def _record_call(user_input: str, profile: str, started: float, reply=None, usage=None, error=None, streamed=False):
+    """Record one finished (or failed) LLM call in the trace store and usage counters."""
+    llm_traces.record(user_input, TRACE_MODEL, started, reply=reply, usage=usage, error=error, streamed=streamed)
+    llm_usage.record(
+        profile, TRACE_MODEL, (time.monotonic() - started) * 1000,
+        getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None),
+        ok=error is None,
+    )
+
+
+async def _build_messages(user_input: str):
+    """Build a minimal messages payload: system prompt (+ retrieved context) + current user input."""
+    messages = [SYSTEM_MESSAGE]
+
+    # Top-k dataset passages for this profile (BM25 over the memory-mapped index; a few ms,
+    # run in a worker thread so scoring and page faults don't stall the event loop).
+    # Returns [] until the background index warm-up (started at startup) finishes.
+    passages = await asyncio.to_thread(retrieve_passages, user_input) if retrieve_passages else []
+    if passages:
+        messages.append({"role": "system", "content": RETRIEVAL_PREAMBLE + "\n---\n".join(passages)})
+
+    # Keeps the request focused and reduces the chance of leaking other data.
+    messages.append({"role": "user", "content": user_input})
+    return messages
+
+
+async def chat_with_gpt(user_input: str, profile: str = "unspecified"):
+    """Send `user_input` (age + health statuses) to the LLM and return the assistant reply.
+
+    `profile` labels the call in the usage counters (the normalized status list).
+    Raises BudgetExceeded without calling the LLM once the daily budget is spent.
+
+    Design goals / safety:
+    - Only a short, focused conversation is sent (system + current user input)
+      to avoid leaking history and limit token usage.
+    - Use conservative model parameters (low temperature) so output
+      is deterministic and concise for medical-adjacent content.
+
+    Returns:
+        assistant_text (str): the raw assistant response (expected to contain
+        three short questions). Callers may split into lines if needed.
+    """
+    llm_usage.check_budget()
+    messages = await _build_messages(user_input)
+
+    # Call the configured provider's chat completion endpoint.
+    # The limiter caps concurrent calls (raises LLMOverloaded when the queue is full)
+    # and wait_for bounds each call, including SDK retries.
+    async with llm_limiter.slot():
+        started = time.monotonic()
+        try:
+            completion = await asyncio.wait_for(
+                llm_provider.complete(messages, COMPLETION_PARAMS),
+                timeout=LLM_TIMEOUT_SECONDS,
+            )
+        except BaseException as e:  # Includes cancellation by the request deadline
+            _record_call(user_input, profile, started, error=e)
+            raise
+
+    # Extract assistant text from response.
+    assistant_text = completion.text
+
+    # Keep a bounded trace and the token/cost usage of the call.
+    _record_call(user_input, profile, started, reply=assistant_text, usage=completion.usage)
+
+    # Return the assistant's text (the generated 3 vet questions).
+    return assistant_text
+
+
+# Replies keyed on the normalized (age band, statuses) profile; see ai_cache.py
+response_cache = ResponseCache()
+
+# Concurrent cache misses for the same profile share one upstream call
+inflight_requests = SingleFlight()
+
+
+def usage_label(profile) -> str:
+    """Status-profile label for the usage counters, e.g. 'allergy,senior'."""
+    return ",".join(profile[1])
+
+
+def build_user_input(profile) -> str:
+    """Render a normalized profile as the user message sent to the model."""
+    band, statuses = profile
+    return f"Dog age: {band}. Health status: {', '.join(statuses)}."
+
+
+async def ask_vet_questions(age, statuses) -> str:
+    """Return vet questions for this dog profile, from cache when possible.
+
+    The cache key and the prompt are both built from the same normalized profile
+    (age life-stage band + sorted, lower-cased statuses), so a cached reply is
+    exactly what the model would have been asked for.
+    """
+    profile = normalize_profile(age, statuses)
+    key = profile_key(profile)
+
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def generate() -> str:
+        # A call for this key may have finished between our cache miss and becoming leader
+        cached = response_cache.peek(key)
+        if cached is not None:
+            return cached
+        with llm_breaker.guard(ignore=(LLMOverloaded, BudgetExceeded)):
+            assistant_text = await asyncio.wait_for(
+                chat_with_gpt(build_user_input(profile), profile=usage_label(profile)), timeout=AI_DEADLINE_SECONDS
+            )
+        await response_cache.set(key, assistant_text)
         return assistant_text
 
+    # Identical concurrent profiles (e.g. a campaign burst) collapse into one LLM call
+    return await inflight_requests.do(key, generate)
+
+
+async def chat_stream(user_input: str, deadline: float = None, profile: str = "unspecified"):
+    """Stream the assistant reply for `user_input` as text deltas (provider streaming API).
+
+    Holds one limiter slot for the whole stream. Each chunk must arrive within
+    LLM_TIMEOUT_SECONDS, so a stalled upstream can't hold the slot forever, and the
+    whole stream must finish by `deadline` (event-loop time) when one is given.
+    """
+    loop = asyncio.get_running_loop()
+
+    def chunk_timeout() -> float:
+        if deadline is None:
+            return LLM_TIMEOUT_SECONDS
+        return max(min(LLM_TIMEOUT_SECONDS, deadline - loop.time()), 0)
+
+    llm_usage.check_budget()
+    messages = await _build_messages(user_input)
+
+    async with llm_limiter.slot():
+        started = time.monotonic()
+        reply, usage, error = "", None, None
+        chunks = llm_provider.stream(messages, COMPLETION_PARAMS).__aiter__()
+        try:
+            while True:
+                try:
+                    delta = await asyncio.wait_for(chunks.__anext__(), timeout=chunk_timeout())
+                except StopAsyncIteration:
+                    break
+                usage = delta.usage or usage
+                if delta.text:
+                    reply += delta.text
+                    yield delta.text
+        except BaseException as e:  # Includes cancellation when the client disconnects
+            error = e
+            raise
+        finally:
+            await chunks.aclose()
+            _record_call(user_input, profile, started, reply=reply, usage=usage, error=error, streamed=True)
+
+
+class StreamedReply:
+    """Question lines of one in-flight streamed reply, shared by every request that joins it."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.finished = False
+        self.task: Optional[asyncio.Task] = None  # The single-flight call producing the lines
+        self._changed = asyncio.Event()
+
+    def push(self, line: str):
+        self.lines.append(line)
+        self._wake()
+
+    def finish(self):
+        self.finished = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self):
+        """Yield every line so far, then each new one; re-raises the call's error at the end."""
+        sent = 0
+        while True:
+            while sent < len(self.lines):
+                sent += 1
+                yield self.lines[sent - 1]
+            if self.finished:
+                break
+            await self._changed.wait()
+        await asyncio.shield(self.task)
+
+
+# Streams in flight per profile key (their calls are also registered in inflight_requests)
+streamed_replies: Dict[str, StreamedReply] = {}
+
+
+async def _stream_reply(profile, key: str, streamed: StreamedReply) -> str:
+    """Single-flight body for streaming misses: stream the model, publish lines, cache the reply."""
+    try:
+        cached = response_cache.peek(key)  # Finished between the caller's miss and this call starting
+        if cached is not None:
+            for line in cached.splitlines():
+                if line.strip():
+                    streamed.push(line.strip())
+            return cached
+
+        reply = ""
+        pending = ""
+        deadline = asyncio.get_running_loop().time() + AI_DEADLINE_SECONDS
+        with llm_breaker.guard(ignore=(LLMOverloaded, BudgetExceeded)):
+            async for delta in chat_stream(build_user_input(profile), deadline=deadline, profile=usage_label(profile)):
+                reply += delta
+                pending += delta
+                *complete, pending = pending.split("\n")
+                for line in complete:
+                    if line.strip():
+                        streamed.push(line.strip())
+        if pending.strip():
+            streamed.push(pending.strip())
+
+        await response_cache.set(key, reply)
+        return reply
+    finally:
+        streamed.finish()
+        if streamed_replies.get(key) is streamed:
+            del streamed_replies[key]
+
+
+async def stream_vet_questions(age, statuses):
+    """Yield vet questions for this dog profile one completed line at a time.
+
+    Same profile normalization, cache and request coalescing as ask_vet_questions().
+    Cached replies are replayed line by line. A miss streams the model in a
+    single-flight call that publishes each question as soon as its line is complete:
+    concurrent stream requests for the profile replay the lines so far and then
+    follow along, and blocking requests get the full reply. The call finishes (and
+    caches the reply) even if the client that started it disconnects.
+    """
+    profile = normalize_profile(age, statuses)
+    key = profile_key(profile)
+
+    cached = await response_cache.get(key)
+    streamed = streamed_replies.get(key)
+    if cached is None and streamed is None and inflight_requests.is_running(key):
+        cached = await ask_vet_questions(age, statuses)  # Join the in-flight blocking call
+    if cached is not None:
+        for line in cached.splitlines():
+            if line.strip():
+                yield line.strip()
+        return
+
+    if streamed is None:
+        streamed = streamed_replies[key] = StreamedReply()
+        streamed.task = inflight_requests.start(key, lambda: _stream_reply(profile, key, streamed))
+    async for line in streamed.follow():
+        yield line
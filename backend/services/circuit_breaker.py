@@ -0,0 +1,96 @@
+# backend/services/circuit_breaker.py - Circuit breaker for the outbound LLM dependency
+# After repeated upstream failures the circuit opens and calls fail immediately with
+# CircuitOpen (the API then serves preset questions) instead of each request waiting out
+# timeouts. After a cool-down a limited number of probe calls are let through (half-open);
+# a successful probe closes the circuit, a failed one re-opens it.
+# Used by: backend/services/chat_services.py, backend/main.py (fallback, stats)
+
+import os
+import time
+from contextlib import contextmanager
+
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures to open
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))  # Open time before probing
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))  # Concurrent probe calls
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing."""
+
+    def __init__(
+        self,
+        failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+        half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = half_open_probes
+        self._opened_at = None  # time.monotonic() when the circuit last opened; None while closed
+        self._consecutive_failures = 0
+        self._probes_in_flight = 0
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return OPEN
+
+    def _admit(self) -> bool:
+        """Let a call through or raise CircuitOpen; returns True when the call is a probe."""
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+            self._probes_in_flight += 1
+            return True
+        self.stats["rejected"] += 1
+        raise CircuitOpen("AI service temporarily unavailable")
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self.stats["opened"] += 1
+
+    @contextmanager
+    def guard(self, ignore: tuple = ()):
+        """
+        Wrap one upstream call. Exceptions in `ignore` (e.g. local load shedding) and
+        cancellation leave the breaker unchanged; any other exception counts as a failure.
+        """
+        probe = self._admit()
+        try:
+            yield
+        except ignore:
+            raise
+        except Exception:
+            self.stats["failures"] += 1
+            self._consecutive_failures += 1
+            if probe or (self._opened_at is None and self._consecutive_failures >= self.failure_threshold):
+                self._open()  # A failed probe re-opens (restarting the cool-down)
+            raise
+        else:
+            self.stats["successes"] += 1
+            self._consecutive_failures = 0
+            if probe:
+                self._opened_at = None  # Probe succeeded: close the circuit
+        finally:
+            if probe:
+                self._probes_in_flight -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+        }
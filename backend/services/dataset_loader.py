@@ -1,55 +1,335 @@
 
-# This keeps startup fast and only uses memory if/when the dataset is needed. 
-# If you later want background startup loading, add a FastAPI startup event to pre-load it.
+# The dataset is warmed in a background thread at startup (by the retrieval index warm-up,
+# see vet_retrieval.py and lifespan in main.py), so no request ever waits for it.
+# Requests that arrive before it's ready just get None.
 
-"""Helper for loading the veterinary dataset with a lazy (cached) loader.
+"""Helper for loading the veterinary dataset in the background with an on-disk snapshot.
 
 Usage:
-    from backend.services.dataset_loader import get_vet_dataset
-    ds = get_vet_dataset()
+    from backend.services.dataset_loader import get_vet_dataset, start_vet_dataset_warmup
+    start_vet_dataset_warmup()  # at startup; returns immediately
+    ds = get_vet_dataset()      # the dataset, or None while loading / after a failure
 
-This module loads the dataset on first use and caches it in memory. Loading can
-be slow and memory-heavy, so lazy loading avoids startup delays unless the
-dataset is actually needed.
+Subset mode (VET_DATASET_SUBSET=1, the default):
+Only dog-related nutrition rows matter to the app, so the dataset is reduced once to a
+compact Arrow file (VET_DATASET_SUBSET_PATH) that every worker memory-maps read-only:
+- rows are streamed (from the local full snapshot if present, else from the Hub with
+  `streaming=True`, so the full split is never materialized);
+- only rows mentioning a species keyword AND a topic keyword are kept;
+- only the VET_DATASET_COLUMNS text columns are kept (default: all string columns).
+A JSON sidecar records the filter settings; the subset is rebuilt when they change.
+
+Full mode (VET_DATASET_SUBSET=0), loading order:
+1. If VET_DATASET_DIR holds a saved snapshot, it is opened with `load_from_disk`
+   (memory-mapped Arrow files: near-instant, little resident memory, no network).
+2. Otherwise, unless VET_DATASET_OFFLINE=1, the dataset is downloaded from the Hub at
+   VET_DATASET_REVISION and saved to VET_DATASET_DIR, so later starts use step 1.
+
+Failed loads are remembered: the next attempt waits VET_DATASET_RETRY_SECONDS, doubling
+after each failure up to VET_DATASET_MAX_RETRY_SECONDS.
+
+Create the pinned subset (or full snapshot) ahead of time (e.g. in the image build) with:
+    python -m backend.services.dataset_loader
 """
+import json
 import logging
-from datasets import load_dataset
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX only; see file_lock()
+except ImportError:
+    fcntl = None
+
+VET_DATASET_NAME = os.getenv("VET_DATASET_NAME", "viggovet/Veterinary-Med")
+VET_DATASET_REVISION = os.getenv("VET_DATASET_REVISION") or None  # Hub commit/tag to pin; None = latest
+VET_DATASET_DIR = os.getenv(
+    "VET_DATASET_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "vet_dataset")),
+)
+VET_DATASET_OFFLINE = os.getenv("VET_DATASET_OFFLINE", "0") == "1"  # Only ever use the snapshot
+# Subset mode: keyword filters (comma-separated, matched as whole words, case-insensitive)
+VET_DATASET_SUBSET = os.getenv("VET_DATASET_SUBSET", "1") == "1"
+VET_DATASET_SUBSET_PATH = os.getenv(
+    "VET_DATASET_SUBSET_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "vet_dataset_subset.arrow")),
+)
+VET_DATASET_COLUMNS = [c.strip() for c in os.getenv("VET_DATASET_COLUMNS", "").split(",") if c.strip()]
+VET_DATASET_SPECIES_KEYWORDS = os.getenv("VET_DATASET_SPECIES_KEYWORDS", "dog,dogs,canine,canines,puppy,puppies")
+VET_DATASET_TOPIC_KEYWORDS = os.getenv(
+    "VET_DATASET_TOPIC_KEYWORDS",
+    "diet,diets,dietary,food,foods,feed,feeding,fed,nutrition,nutritional,nutrient,nutrients,calorie,calories,"
+    "protein,fat,fiber,kibble,treat,treats,supplement,supplements,weight,obese,obesity,allergy,allergies,"
+    "appetite,vitamin,vitamins,mineral,minerals",
+)
+SUBSET_BATCH_ROWS = 1000  # Rows per Arrow record batch while writing the subset
+
+VET_DATASET_RETRY_SECONDS = float(os.getenv("VET_DATASET_RETRY_SECONDS", "60"))
+VET_DATASET_MAX_RETRY_SECONDS = float(os.getenv("VET_DATASET_MAX_RETRY_SECONDS", "3600"))
 
 # Module-level cache for the loaded dataset. Starts as None and is populated
-# on the first successful call to `get_vet_dataset()`.
+# by the background warm-up once a load succeeds.
 _VET_DATASET = None
 
+# Loader state, shared between the warm-up thread and request handlers
+_load_lock = threading.Lock()
+_state = {
+    "status": "idle",  # idle | loading | ready | failed
+    "source": None,  # subset | snapshot | hub
+    "failures": 0,
+    "last_error": None,
+    "next_retry_at": 0.0,  # time.monotonic() before which no new attempt starts
+    "load_seconds": None,
+}
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """
+    Hold an flock on `path + ".lock"` across worker processes: exclusive while building
+    an artifact at `path`, shared while opening it. Callers re-check whether the artifact
+    is up to date after acquiring the exclusive lock, since another worker may have built
+    it meanwhile. Without fcntl (Windows) this only yields, as with a single worker.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def has_snapshot(path: str = VET_DATASET_DIR) -> bool:
+    """True when `path` holds a dataset saved with `save_to_disk`."""
+    return os.path.isfile(os.path.join(path, "dataset_info.json")) or os.path.isfile(
+        os.path.join(path, "state.json")
+    )
+
+
+def save_vet_dataset_snapshot(path: str = VET_DATASET_DIR):
+    """Download the pinned dataset from the Hub and save it as Arrow files under `path`."""
+    from datasets import load_dataset
+
+    ds = load_dataset(VET_DATASET_NAME, split="train", revision=VET_DATASET_REVISION)
+    ds.save_to_disk(path)
+    return ds
+
+
+def keyword_pattern(keywords: str):
+    """Compile a comma-separated keyword list into one whole-word, case-insensitive regex."""
+    words = [re.escape(w.strip()) for w in keywords.split(",") if w.strip()]
+    return re.compile(r"\b(?:" + "|".join(words) + r")\b", re.IGNORECASE) if words else None
+
+
+def subset_config() -> dict:
+    """Settings the subset depends on (stored next to it; a mismatch triggers a rebuild)."""
+    return {
+        "dataset": VET_DATASET_NAME,
+        "revision": VET_DATASET_REVISION,
+        "columns": VET_DATASET_COLUMNS,
+        "species_keywords": VET_DATASET_SPECIES_KEYWORDS,
+        "topic_keywords": VET_DATASET_TOPIC_KEYWORDS,
+    }
+
+
+def dataset_fingerprint() -> dict:
+    """What the loaded dataset depends on (used by vet_retrieval to decide when to rebuild)."""
+    return {"subset": subset_config()} if VET_DATASET_SUBSET else {
+        "dataset": VET_DATASET_NAME, "revision": VET_DATASET_REVISION
+    }
+
+
+def has_subset(path: str = VET_DATASET_SUBSET_PATH) -> bool:
+    """True when `path` holds a subset built with the current settings."""
+    try:
+        with open(path + ".json") as f:
+            return json.load(f).get("config") == subset_config() and os.path.isfile(path)
+    except (OSError, ValueError):
+        return False
+
+
+def filter_rows(rows, columns=None, species=None, topic=None):
+    """
+    Yield projected rows (text columns only) that mention a species AND a topic keyword.
+    `columns` defaults to the string-valued columns of the first row.
+    """
+    species = species or keyword_pattern(VET_DATASET_SPECIES_KEYWORDS)
+    topic = topic or keyword_pattern(VET_DATASET_TOPIC_KEYWORDS)
+    for row in rows:
+        if columns is None:
+            columns = VET_DATASET_COLUMNS or [k for k, v in row.items() if isinstance(v, str)]
+        projected = {c: row.get(c) if isinstance(row.get(c), str) else None for c in columns}
+        text = " ".join(v for v in projected.values() if v)
+        if (species is None or species.search(text)) and (topic is None or topic.search(text)):
+            yield projected
+
+
+def build_vet_dataset_subset(path: str = VET_DATASET_SUBSET_PATH) -> dict:
+    """Stream the source dataset through filter_rows() into a compact Arrow file at `path`.
+
+    Reads the local full snapshot when there is one, otherwise streams from the Hub
+    (requires network unless VET_DATASET_OFFLINE=1 and a snapshot exists). Memory use
+    is bounded by one record batch; the file is written to a temp name and renamed,
+    so workers never open a partial subset. Callers hold file_lock(path) so only one
+    worker builds at a time.
+    """
+    import pyarrow as pa
+
+    if has_snapshot():
+        from datasets import load_from_disk
+        source = load_from_disk(VET_DATASET_DIR).to_iterable_dataset()
+    elif VET_DATASET_OFFLINE:
+        raise FileNotFoundError(f"No vet dataset snapshot in {VET_DATASET_DIR} to build the subset from")
+    else:
+        from datasets import load_dataset
+        source = load_dataset(VET_DATASET_NAME, split="train", revision=VET_DATASET_REVISION, streaming=True)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    writer = schema = None
+    kept = 0
+    batch = []
+    try:
+        with pa.OSFile(tmp, "wb") as sink:
+            for row in filter_rows(source):
+                if writer is None:
+                    schema = pa.schema([(c, pa.string()) for c in row])
+                    # IPC stream format: what datasets.Dataset.from_file memory-maps
+                    writer = pa.ipc.new_stream(sink, schema)
+                batch.append(row)
+                if len(batch) >= SUBSET_BATCH_ROWS:
+                    writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                    kept += len(batch)
+                    batch = []
+            if writer is None:
+                raise ValueError("No rows matched the vet dataset subset filters")
+            if batch:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                kept += len(batch)
+            writer.close()
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    meta = {"config": subset_config(), "rows": kept, "bytes": os.path.getsize(path)}
+    with open(tmp + ".json", "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp + ".json", path + ".json")  # has_subset() runs unlocked, so never show a partial sidecar
+    return meta
+
 
 def load_vet_dataset():
-    """Perform the actual dataset download/load and return the dataset object.
+    """Perform the actual dataset load and return (dataset, source).
 
     This function may raise exceptions from the `datasets` library (network
-    errors, missing dataset, etc.). Callers that want resilience should use
-    `get_vet_dataset()` which catches errors and returns None on failure.
+    errors, missing dataset or snapshot, etc.). Callers that want resilience
+    should use `warm_vet_dataset()` which catches errors and applies backoff.
     """
-    # Delegates to the `datasets` library to obtain the named dataset split.
-    return load_dataset("viggovet/Veterinary-Med", split="train")
+    # Imported here so the app runs (without the dataset) when `datasets` isn't installed
+    from datasets import Dataset, load_from_disk
 
+    if VET_DATASET_SUBSET:
+        if not has_subset():
+            with file_lock(VET_DATASET_SUBSET_PATH):  # One worker builds; the others wait, then reuse it
+                if not has_subset():
+                    build_vet_dataset_subset()
+        # Memory-maps the shared Arrow file (read-only; pages are shared between workers)
+        return Dataset.from_file(VET_DATASET_SUBSET_PATH), "subset"
 
-def get_vet_dataset():
-    """Return the cached dataset, loading it on first call.
+    if not has_snapshot():
+        if VET_DATASET_OFFLINE:
+            raise FileNotFoundError(f"No vet dataset snapshot in {VET_DATASET_DIR} (VET_DATASET_OFFLINE=1)")
+        with file_lock(VET_DATASET_DIR):
+            if not has_snapshot():
+                save_vet_dataset_snapshot()
+        source = "hub"
+    else:
+        source = "snapshot"
+    # load_from_disk memory-maps the Arrow files instead of reading them into memory
+    return load_from_disk(VET_DATASET_DIR), source
 
-    Behavior:
-    - If the dataset is already loaded, return it immediately (fast).
-    - On first call, attempt to load via `load_vet_dataset()` and cache result.
-    - If loading fails, log the exception and return None (caller should
-      handle a None result).
 
-    This pattern keeps application startup fast and only uses memory when the
-    dataset is actually required.
+def warm_vet_dataset():
+    """Load the dataset into the module cache (blocking). Safe to call from any thread.
+
+    Does nothing when the dataset is already loaded, another load is running,
+    or the failure backoff hasn't elapsed yet.
     """
     global _VET_DATASET
-    if _VET_DATASET is None:
+    if _VET_DATASET is not None or time.monotonic() < _state["next_retry_at"]:
+        return _VET_DATASET
+    if not _load_lock.acquire(blocking=False):
+        return None  # Another thread is already loading
+    try:
+        _state["status"] = "loading"
+        started = time.monotonic()
         try:
-            # Load and cache the dataset (may block while downloading/initializing).
-            _VET_DATASET = load_vet_dataset()
+            _VET_DATASET, _state["source"] = load_vet_dataset()
         except Exception as exc:
-            # Record the exception for debugging; keep running but return None.
-            logging.getLogger(__name__).exception("Failed to load vet dataset: %s", exc)
-            _VET_DATASET = None
-    return _VET_DATASET
\ No newline at end of file
+            # Remember the failure and back off exponentially before the next attempt
+            _state["failures"] += 1
+            _state["last_error"] = f"{type(exc).__name__}: {exc}"
+            delay = min(VET_DATASET_RETRY_SECONDS * 2 ** (_state["failures"] - 1), VET_DATASET_MAX_RETRY_SECONDS)
+            _state["next_retry_at"] = time.monotonic() + delay
+            _state["status"] = "failed"
+            logging.getLogger(__name__).warning("Failed to load vet dataset (retry in %.0fs): %s", delay, exc)
+        else:
+            _state.update(status="ready", last_error=None, load_seconds=round(time.monotonic() - started, 3))
+    finally:
+        _load_lock.release()
+    return _VET_DATASET
+
+
+def start_vet_dataset_warmup():
+    """Start `warm_vet_dataset()` in a daemon thread (returns immediately)."""
+    if _VET_DATASET is not None or _load_lock.locked() or time.monotonic() < _state["next_retry_at"]:
+        return
+    threading.Thread(target=warm_vet_dataset, name="vet-dataset-warmup", daemon=True).start()
+
+
+def dataset_retry_at() -> float:
+    """time.monotonic() value before which no new load attempt starts (0 when not backing off)."""
+    return _state["next_retry_at"]
+
+
+def get_vet_dataset():
+    """Return the cached dataset, or None if it isn't loaded (never blocks).
+
+    When the dataset isn't loaded and no load is running or backing off, a
+    background warm-up is started so a later call can succeed.
+    """
+    if _VET_DATASET is None:
+        start_vet_dataset_warmup()
+    return _VET_DATASET
+
+
+def vet_dataset_status() -> dict:
+    """Loader state for the admin endpoints."""
+    retry_in = _state["next_retry_at"] - time.monotonic()
+    return {
+        **{k: v for k, v in _state.items() if k != "next_retry_at"},
+        "retry_in_seconds": round(retry_in, 1) if retry_in > 0 else 0,
+        "snapshot_dir": VET_DATASET_DIR,
+        "subset_path": VET_DATASET_SUBSET_PATH if VET_DATASET_SUBSET else None,
+        "rows": len(_VET_DATASET) if _VET_DATASET is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    # Build the pinned offline artifact: python -m backend.services.dataset_loader
+    if VET_DATASET_SUBSET:
+        with file_lock(VET_DATASET_SUBSET_PATH):
+            meta = build_vet_dataset_subset()
+        print(f"Saved {meta['rows']} filtered rows ({meta['bytes']} bytes) to {VET_DATASET_SUBSET_PATH}")
+    else:
+        with file_lock(VET_DATASET_DIR):
+            dataset = save_vet_dataset_snapshot()
+        print(f"Saved {len(dataset)} rows of {VET_DATASET_NAME}@{VET_DATASET_REVISION or 'latest'} to {VET_DATASET_DIR}")
@@ -0,0 +1,68 @@
+# backend/services/export_service.py - Encode streamed database rows as CSV or NDJSON text
+# Works chunk by chunk on the row batches yielded by models.database.stream_rows(), so an
+# export of any size is produced with constant memory.
+# Used by: backend/main.py (GET /api/questionnaires/export)
+
+import csv
+import datetime
+import decimal
+import io
+import json
+from typing import AsyncIterator, List
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value):
+    """json.dumps fallback for the Postgres types asyncpg returns."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return str(value)
+
+
+async def _replay(first: List, chunks: AsyncIterator[List]) -> AsyncIterator[List]:
+    """Yield an already fetched first batch, then the rest of `chunks`."""
+    yield first
+    async for rows in chunks:
+        yield rows
+
+
+async def prefetch_rows(chunks: AsyncIterator[List]) -> AsyncIterator[List]:
+    """
+    Fetch the first batch now and return an iterator over all batches.
+    Called before building the StreamingResponse, so a query or connection error
+    is raised while an error status can still be sent (once the headers are out,
+    a failure can only cut the body short).
+    """
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = []
+    return _replay(first, chunks) if first else chunks
+
+
+async def encode_rows(chunks: AsyncIterator[List], fmt: str) -> AsyncIterator[str]:
+    """
+    Turn batches of asyncpg Records into CSV (with a header row) or NDJSON text.
+    Yields one string per batch for a StreamingResponse.
+    """
+    header_written = False
+    async for rows in chunks:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if not header_written:
+                writer.writerow(rows[0].keys())
+                header_written = True
+            # Array columns (e.g. statuses_preReg) are written comma-joined, like status_dietRelat_preReg
+            writer.writerows(
+                tuple(",".join(v) if isinstance(v, list) else v for v in row.values()) for row in rows
+            )
+            yield buffer.getvalue()
+        else:
+            yield "".join(json.dumps(dict(row), default=_json_default) + "\n" for row in rows)
@@ -0,0 +1,68 @@
+# backend/services/llm_limiter.py - Admission control for outbound LLM calls
+# Caps how many LLM requests run at once and how many may wait for a slot; anything beyond
+# that fails fast with LLMOverloaded so the API can answer 503 instead of piling up work.
+# Used by: backend/services/chat_services.py
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # Upstream calls in flight
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))  # Callers allowed to wait for a slot
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "5"))  # Longest wait for a slot
+
+
+class LLMOverloaded(Exception):
+    """Raised when the LLM call queue is full or a slot didn't free up in time."""
+
+
+class ConcurrencyLimiter:
+    """Semaphore with a bounded wait queue and a wait timeout."""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of the `async with` block."""
+        # Count admissions synchronously: semaphore state lags behind callers that
+        # haven't reached acquire() yet, so it can't be used for the queue check
+        if self.in_flight + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise LLMOverloaded("Too many AI requests queued; try again shortly")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LLMOverloaded("Timed out waiting for an AI request slot")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
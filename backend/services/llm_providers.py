@@ -0,0 +1,202 @@
+# backend/services/llm_providers.py - Pluggable LLM backends behind chat_with_gpt
+# chat_services.py talks to a provider instead of the OpenAI SDK directly, so the backend
+# can be swapped by configuration (LLM_PROVIDER):
+#   openai - the real OpenAI API (needs OPENAI_API_KEY)
+#   fake   - deterministic local replies with configurable latency and error rate; no key
+#            or network needed, for load testing the whole service on a laptop
+# Used by: backend/services/chat_services.py
+
+import asyncio
+import hashlib
+import math
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, NamedTuple, Optional
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").strip().lower()
+
+# Fake provider tunables (environment overrides)
+# Latency spec: "fixed:MS", "uniform:MIN_MS:MAX_MS" or "lognormal:MEDIAN_MS:SIGMA"
+LLM_FAKE_LATENCY = os.getenv("LLM_FAKE_LATENCY", "lognormal:800:0.5")
+LLM_FAKE_ERROR_RATE = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))  # Fraction of calls that fail
+LLM_FAKE_SEED = os.getenv("LLM_FAKE_SEED")  # Set for a reproducible latency/error sequence
+
+
+class Usage(NamedTuple):
+    prompt_tokens: Optional[int]
+    completion_tokens: Optional[int]
+
+
+class Completion(NamedTuple):
+    text: str
+    usage: Optional[Usage]
+
+
+class StreamDelta(NamedTuple):
+    text: str  # May be empty (e.g. the final usage-only chunk)
+    usage: Optional[Usage]
+
+
+class LLMProvider(ABC):
+    """
+    Interface: one chat completion, blocking or streamed, for a list of chat messages.
+    A provider missing either method fails when it is instantiated, not on its first call.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def complete(self, messages: list, params: dict) -> Completion:
+        """Return the whole reply."""
+
+    @abstractmethod
+    def stream(self, messages: list, params: dict) -> AsyncIterator[StreamDelta]:
+        """Yield the reply as it is generated (implemented as an async generator)."""
+
+    async def close(self):
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions through the async SDK and a shared keep-alive connection pool."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], timeout: float, max_retries: int, max_connections: int):
+        # Fail fast with a clear error if no key is present to help developers notice missing config.
+        if not api_key:
+            raise RuntimeError(
+                "OpenAI API key not found. Set OPENAI_API_KEY in .env or environment variables"
+                " (or LLM_PROVIDER=fake to run without one)."
+            )
+        import httpx
+        import openai  # Switched back to OpenAI library
+
+        # Shared HTTP connection pool for all LLM calls: keep-alive connections sized to the
+        # concurrency limit, so calls reuse warm TLS connections instead of reconnecting.
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=120,
+            ),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+        )
+        # The async client runs on the event loop, so slow LLM calls don't occupy threadpool threads.
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            http_client=self.http_client,
+            timeout=timeout,
+            max_retries=max_retries,
+        )
+
+    async def complete(self, messages: list, params: dict) -> Completion:
+        response = await self.client.chat.completions.create(messages=messages, **params)
+        return Completion(response.choices[0].message.content, getattr(response, "usage", None))
+
+    async def stream(self, messages: list, params: dict) -> AsyncIterator[StreamDelta]:
+        # include_usage: the final chunk carries token counts for the trace
+        stream = await self.client.chat.completions.create(
+            messages=messages, stream=True, stream_options={"include_usage": True}, **params
+        )
+        async with stream:  # Closes the HTTP response if the consumer stops early
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                yield StreamDelta(text or "", getattr(chunk, "usage", None))
+
+    async def close(self):
+        await self.client.close()
+
+
+class FakeLLMError(Exception):
+    """Injected failure from the fake provider (counts as an upstream error)."""
+
+
+# Canned questions for the fake provider; each reply is three of them, picked by prompt hash
+FAKE_QUESTIONS = [
+    "What daily calorie target fits my dog's age and activity level?",
+    "Should the protein or fat content of the diet change at this life stage?",
+    "Which ingredients should I watch for given these health factors?",
+    "How often should we re-check weight and body condition score?",
+    "Are any supplements worth discussing, or could they interfere with the diet?",
+    "How should treats fit into the daily food allowance?",
+    "What signs would tell us the current diet isn't working?",
+    "Is a gradual food transition needed, and over how many days?",
+]
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec ("fixed:MS", "uniform:MIN:MAX", "lognormal:MEDIAN:SIGMA") into a sampler (seconds)."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(":") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Invalid LLM_FAKE_LATENCY spec: {spec!r}")
+
+
+class FakeProvider(LLMProvider):
+    """
+    Local stand-in for the LLM: same prompt always gives the same reply, after a sampled
+    latency, failing with FakeLLMError at the configured rate. Streams word by word with
+    the latency split between time-to-first-token and the remaining chunks.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: str = LLM_FAKE_LATENCY,
+        error_rate: float = LLM_FAKE_ERROR_RATE,
+        seed: Optional[str] = LLM_FAKE_SEED,
+    ):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    @staticmethod
+    def reply_for(messages: list) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        start = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=4).digest(), "big")
+        picks = [FAKE_QUESTIONS[(start + i) % len(FAKE_QUESTIONS)] for i in range(3)]
+        return "\n".join(f"{i}. {q}" for i, q in enumerate(picks, 1))
+
+    @staticmethod
+    def usage_for(messages: list, text: str) -> Usage:
+        # Rough token counts (~4 characters per token) so usage accounting has numbers to work with
+        prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        return Usage(prompt_chars // 4 + 1, len(text) // 4 + 1)
+
+    def _maybe_fail(self):
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise FakeLLMError("Injected fake LLM failure")
+
+    async def complete(self, messages: list, params: dict) -> Completion:
+        await asyncio.sleep(self.sample_latency(self.rng))
+        self._maybe_fail()
+        text = self.reply_for(messages)
+        return Completion(text, self.usage_for(messages, text))
+
+    async def stream(self, messages: list, params: dict) -> AsyncIterator[StreamDelta]:
+        latency = self.sample_latency(self.rng)
+        await asyncio.sleep(latency * 0.3)  # Time to first token
+        self._maybe_fail()
+        text = self.reply_for(messages)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            yield StreamDelta(word if i == 0 else " " + word, None)
+            await asyncio.sleep(latency * 0.7 / len(words))
+        yield StreamDelta("", self.usage_for(messages, text))
+
+
+def create_provider(name: str = LLM_PROVIDER, **openai_options) -> LLMProvider:
+    """Build the provider selected by LLM_PROVIDER; `openai_options` go to OpenAIProvider."""
+    if name == "openai":
+        return OpenAIProvider(**openai_options)
+    if name == "fake":
+        return FakeProvider()
+    raise ValueError(f"Unknown LLM_PROVIDER {name!r}; expected 'openai' or 'fake'")
@@ -0,0 +1,96 @@
+# backend/services/llm_trace.py - Bounded in-memory trace of recent LLM calls
+# Replaces the old module-level conversation_history list, which grew by one entry per
+# request forever. Traces live in a fixed-capacity ring buffer (oldest dropped first),
+# so memory stays flat no matter how many requests a worker serves.
+# Used by: backend/services/chat_services.py (record), backend/main.py (admin endpoint)
+
+import hashlib
+import os
+import random
+import time
+from collections import deque
+from itertools import islice
+from typing import NamedTuple, Optional
+
+# Tunables (environment overrides)
+LLM_TRACE_CAPACITY = int(os.getenv("LLM_TRACE_CAPACITY", "200"))  # Traces kept (ring buffer size)
+LLM_TRACE_SAMPLE_RATE = float(os.getenv("LLM_TRACE_SAMPLE_RATE", "1.0"))  # Fraction of calls recorded
+LLM_TRACE_MAX_REPLY_CHARS = int(os.getenv("LLM_TRACE_MAX_REPLY_CHARS", "1000"))  # Reply text kept per trace
+
+
+def prompt_hash(text: str) -> str:
+    """Short stable hash of the prompt, so traces can be grouped without storing the input."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class LLMTrace(NamedTuple):
+    """One compact trace record (a tuple, so no per-instance __dict__)."""
+    timestamp: float  # Unix time the call finished
+    prompt_hash: str
+    model: str
+    streamed: bool
+    latency_ms: float
+    prompt_tokens: Optional[int]
+    completion_tokens: Optional[int]
+    reply: Optional[str]  # Truncated to LLM_TRACE_MAX_REPLY_CHARS
+    error: Optional[str]  # Exception class name when the call failed
+
+
+class TraceStore:
+    """
+    Fixed-capacity ring buffer of LLMTrace records with optional sampling.
+    Appends are single deque operations, so no lock is needed on the event loop.
+    """
+
+    def __init__(
+        self,
+        capacity: int = LLM_TRACE_CAPACITY,
+        sample_rate: float = LLM_TRACE_SAMPLE_RATE,
+        max_reply_chars: int = LLM_TRACE_MAX_REPLY_CHARS,
+    ):
+        self.sample_rate = sample_rate
+        self.max_reply_chars = max_reply_chars
+        self._traces: "deque[LLMTrace]" = deque(maxlen=max(capacity, 0))
+        self.stats = {"recorded": 0, "sampled_out": 0}
+
+    def record(
+        self,
+        prompt: str,
+        model: str,
+        started: float,
+        reply: Optional[str] = None,
+        usage=None,
+        error: Optional[BaseException] = None,
+        streamed: bool = False,
+    ):
+        """
+        Store one trace. `started` is a time.monotonic() reading taken before the call;
+        `usage` is the SDK usage object (prompt_tokens / completion_tokens), if any.
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.stats["sampled_out"] += 1
+            return
+        self.stats["recorded"] += 1
+        self._traces.append(LLMTrace(
+            timestamp=time.time(),
+            prompt_hash=prompt_hash(prompt),
+            model=model,
+            streamed=streamed,
+            latency_ms=round((time.monotonic() - started) * 1000, 1),
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            reply=reply[: self.max_reply_chars] if reply is not None else None,
+            error=type(error).__name__ if error is not None else None,
+        ))
+
+    def recent(self, limit: int = 50) -> list:
+        """Newest-first list of up to `limit` traces as dicts."""
+        return [t._asdict() for t in islice(reversed(self._traces), limit)]
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "stored": len(self._traces),
+            "capacity": self._traces.maxlen,
+            "sample_rate": self.sample_rate,
+        }
@@ -0,0 +1,209 @@
+# backend/services/llm_usage.py - Token, latency and cost accounting for LLM calls
+# Every call records its model, prompt/completion tokens and latency. Totals, a rolling
+# per-minute window and per-status-profile breakdowns (with latency and token histograms)
+# are kept in memory for the admin endpoint. An optional daily budget makes callers raise
+# BudgetExceeded, which the API turns into the preset-question fallback.
+# Used by: backend/services/chat_services.py (record, budget check), backend/main.py (endpoint)
+
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+# Prices in USD per 1M tokens (defaults: gpt-4o-mini list prices)
+LLM_PRICE_INPUT_PER_1M = float(os.getenv("LLM_PRICE_INPUT_PER_1M", "0.15"))
+LLM_PRICE_OUTPUT_PER_1M = float(os.getenv("LLM_PRICE_OUTPUT_PER_1M", "0.60"))
+# Optional spend cap per UTC day; unset or 0 disables it
+LLM_DAILY_BUDGET_USD = float(os.getenv("LLM_DAILY_BUDGET_USD", "0") or 0) or None
+LLM_USAGE_WINDOW_MINUTES = int(os.getenv("LLM_USAGE_WINDOW_MINUTES", "60"))  # Rolling window length
+LLM_USAGE_MAX_PROFILES = int(os.getenv("LLM_USAGE_MAX_PROFILES", "200"))  # Distinct profiles tracked
+
+# Histogram upper bounds (the last bucket catches everything above)
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+TOKEN_BUCKETS = (25, 50, 100, 150, 200, 300, 500)
+
+OTHER_PROFILE = "(other)"  # Bucket for profiles beyond LLM_USAGE_MAX_PROFILES
+
+
+class BudgetExceeded(Exception):
+    """Raised before an LLM call when today's spend has reached LLM_DAILY_BUDGET_USD."""
+
+
+def call_cost(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> float:
+    return ((prompt_tokens or 0) * LLM_PRICE_INPUT_PER_1M + (completion_tokens or 0) * LLM_PRICE_OUTPUT_PER_1M) / 1e6
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are reported as the bucket's upper bound."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float):
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.bounds[i] if i < len(self.bounds) else f">{self.bounds[-1]}"
+        return None
+
+    def snapshot(self) -> dict:
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": round(self.total / self.count, 1) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class UsageStats:
+    """Counters for one aggregation (all calls, one profile)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.completion_hist = Histogram(TOKEN_BUCKETS)
+
+    def add(self, latency_ms: float, prompt_tokens, completion_tokens, cost: float, ok: bool):
+        self.calls += 1
+        self.errors += 0 if ok else 1
+        self.prompt_tokens += prompt_tokens or 0
+        self.completion_tokens += completion_tokens or 0
+        self.cost_usd += cost
+        self.latency_ms.observe(latency_ms)
+        if completion_tokens is not None:
+            self.completion_hist.observe(completion_tokens)
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "avg_cost_usd": round(self.cost_usd / self.calls, 8) if self.calls else None,
+            "latency_ms": self.latency_ms.snapshot(),
+            "completion_tokens_hist": self.completion_hist.snapshot(),
+        }
+
+
+class UsageMeter:
+    """Aggregates per-call usage; all state is bounded (fixed profiles, fixed window)."""
+
+    def __init__(
+        self,
+        daily_budget_usd: Optional[float] = LLM_DAILY_BUDGET_USD,
+        window_minutes: int = LLM_USAGE_WINDOW_MINUTES,
+        max_profiles: int = LLM_USAGE_MAX_PROFILES,
+    ):
+        self.daily_budget_usd = daily_budget_usd
+        self.max_profiles = max_profiles
+        self.totals = UsageStats()
+        self.by_profile = {}
+        self.by_model = {}
+        # Rolling window: [minute, calls, errors, prompt_tokens, completion_tokens, cost] per minute
+        self._minutes = deque(maxlen=window_minutes)
+        self._day = None
+        self.day_cost_usd = 0.0
+        self.budget_rejections = 0
+
+    def _today(self) -> str:
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self.day_cost_usd = 0.0
+
+    def over_budget(self) -> bool:
+        if not self.daily_budget_usd:
+            return False
+        self._roll_day()
+        return self.day_cost_usd >= self.daily_budget_usd
+
+    def check_budget(self):
+        """Raise BudgetExceeded when today's spend has reached the budget."""
+        if self.over_budget():
+            self.budget_rejections += 1
+            raise BudgetExceeded("Daily AI budget reached")
+
+    def record(
+        self,
+        profile: str,
+        model: str,
+        latency_ms: float,
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int],
+        ok: bool = True,
+    ):
+        cost = call_cost(prompt_tokens, completion_tokens)
+        self._roll_day()
+        self.day_cost_usd += cost
+
+        self.totals.add(latency_ms, prompt_tokens, completion_tokens, cost, ok)
+        for table, key in ((self.by_profile, profile), (self.by_model, model)):
+            if key not in table and len(table) >= self.max_profiles:
+                key = OTHER_PROFILE
+            table.setdefault(key, UsageStats()).add(latency_ms, prompt_tokens, completion_tokens, cost, ok)
+
+        minute = int(time.time() // 60)
+        if not self._minutes or self._minutes[-1][0] != minute:
+            self._minutes.append([minute, 0, 0, 0, 0, 0.0])
+        bucket = self._minutes[-1]
+        bucket[1] += 1
+        bucket[2] += 0 if ok else 1
+        bucket[3] += prompt_tokens or 0
+        bucket[4] += completion_tokens or 0
+        bucket[5] += cost
+
+    def window(self) -> dict:
+        """Sums over the last LLM_USAGE_WINDOW_MINUTES minutes."""
+        oldest = int(time.time() // 60) - (self._minutes.maxlen or 0) + 1
+        recent = [b for b in self._minutes if b[0] >= oldest]
+        return {
+            "minutes": self._minutes.maxlen,
+            "calls": sum(b[1] for b in recent),
+            "errors": sum(b[2] for b in recent),
+            "prompt_tokens": sum(b[3] for b in recent),
+            "completion_tokens": sum(b[4] for b in recent),
+            "cost_usd": round(sum(b[5] for b in recent), 6),
+        }
+
+    def snapshot(self) -> dict:
+        self._roll_day()
+        return {
+            "totals": self.totals.snapshot(),
+            "window": self.window(),
+            "today": {
+                "date": self._day,
+                "cost_usd": round(self.day_cost_usd, 6),
+                "budget_usd": self.daily_budget_usd,
+                "over_budget": self.over_budget(),
+                "budget_rejections": self.budget_rejections,
+            },
+            "by_model": {k: v.snapshot() for k, v in self.by_model.items()},
+            "by_profile": {k: v.snapshot() for k, v in self.by_profile.items()},
+            "prices_per_1m": {"input": LLM_PRICE_INPUT_PER_1M, "output": LLM_PRICE_OUTPUT_PER_1M},
+        }
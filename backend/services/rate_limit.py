@@ -0,0 +1,234 @@
+# backend/services/rate_limit.py - Per-client token-bucket rate limiting for expensive routes
+# A pure ASGI middleware checks each request against the rule for its (method, path) before
+# any routing, body parsing, DB or LLM work happens. Clients are keyed by X-API-Key when it
+# is one of RATE_LIMIT_API_KEYS, otherwise by client IP (an unknown key is ignored, so
+# rotating made-up keys can't dodge the limit). Over-limit requests get 429 with Retry-After.
+#
+# Rules come from RATE_LIMITS, e.g.
+#   RATE_LIMITS="POST /api/questions/ai=20/60:5; POST /api/submit-dog-info=60/60"
+# meaning COUNT requests per SECONDS, with an optional burst size (defaults to COUNT).
+#
+# Bucket stores:
+#   memory   - per-worker dict, no locks needed on the event loop (default)
+#   postgres - shared across workers via one atomic UPSERT per admitted request; denials are
+#              remembered locally until Retry-After, so repeat rejections skip the round trip
+# Used by: backend/main.py
+
+import hashlib
+import json
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMITS = os.getenv(
+    "RATE_LIMITS",
+    "POST /api/questions/ai=20/60:5;"
+    "POST /api/questions/ai/stream=20/60:5;"
+    "POST /api/submit-dog-info=60/60:10;"
+    "POST /api/submit-dog-info/batch=10/60:2",
+)
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")  # memory | postgres
+# Trusted proxy hops in front of the app: 0 ignores X-Forwarded-For; N keys on the Nth entry from
+# the right (the address the outermost trusted proxy saw; entries left of it are client-supplied)
+RATE_LIMIT_TRUST_PROXY = int(os.getenv("RATE_LIMIT_TRUST_PROXY", "0"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # In-memory buckets before pruning
+# Comma-separated API keys that get their own bucket; any other X-API-Key is keyed by IP
+RATE_LIMIT_API_KEYS = frozenset(
+    key.strip().encode("latin-1") for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key.strip()
+)
+
+
+class RateRule:
+    """Refill `rate` tokens per second up to `burst`; each request costs one token."""
+
+    __slots__ = ("name", "rate", "burst")
+
+    def __init__(self, name: str, count: float, seconds: float, burst: Optional[float] = None):
+        self.name = name
+        self.rate = count / seconds
+        self.burst = burst if burst is not None else count
+
+
+def parse_rules(spec: str) -> Dict[Tuple[str, str], RateRule]:
+    """Parse RATE_LIMITS into {(METHOD, path): RateRule}."""
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        route, _, limit = item.partition("=")
+        method, _, path = route.strip().partition(" ")
+        rate, _, burst = limit.strip().partition(":")
+        count, _, seconds = rate.partition("/")
+        if not (method and path and count and seconds):
+            raise ValueError(f"Invalid RATE_LIMITS entry: {item!r}")
+        name = f"{method.upper()} {path.strip()}"
+        rules[(method.upper(), path.strip())] = RateRule(
+            name, float(count), float(seconds), float(burst) if burst else None
+        )
+    return rules
+
+
+class MemoryBucketStore:
+    """Token buckets in a plain dict (one worker). Returns 0 when admitted, else seconds to wait."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}  # key -> [tokens, last refill time, seconds to refill fully]
+
+    def _prune(self, now: float):
+        # Drop buckets idle long enough to be full again (same as never seen); if that's not
+        # enough, drop the oldest half (dicts keep insertion order)
+        stale = [k for k, (tokens, last, refill) in self._buckets.items() if now - last >= refill]
+        for k in stale:
+            del self._buckets[k]
+        if len(self._buckets) >= self.max_keys:
+            for k in list(self._buckets)[: len(self._buckets) // 2]:
+                del self._buckets[k]
+
+    async def take(self, key: str, rule: RateRule) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [rule.burst - 1, now, rule.burst / rule.rate]
+            return 0.0
+        tokens = min(rule.burst, bucket[0] + (now - bucket[1]) * rule.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rule.rate
+
+
+class PostgresBucketStore:
+    """
+    Shared token buckets in the rate_limit_buckets table (see schemas/TABLE_CREATE.sql).
+    The refill, check and decrement happen in one statement, so concurrent workers can't
+    over-admit. Takes the database helpers as arguments so this module doesn't import models/.
+    """
+
+    CREATE_SQL = """CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                        bucket_key TEXT PRIMARY KEY,
+                        tokens DOUBLE PRECISION NOT NULL,
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+                    )"""
+
+    # $1 key, $2 burst, $3 rate per second. Returns a row only when the request is admitted.
+    TAKE_SQL = """INSERT INTO rate_limit_buckets AS b (bucket_key, tokens, updated_at)
+                  VALUES ($1, $2 - 1, clock_timestamp())
+                  ON CONFLICT (bucket_key) DO UPDATE SET
+                      tokens = LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3) - 1,
+                      updated_at = clock_timestamp()
+                  WHERE LEAST($2, b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * $3) >= 1
+                  RETURNING tokens"""
+
+    def __init__(self, fetch_one, execute_query):
+        self.fetch_one = fetch_one
+        self.execute_query = execute_query
+
+    async def ensure_table(self):
+        await self.execute_query(self.CREATE_SQL)
+
+    async def take(self, key: str, rule: RateRule) -> float:
+        row = await self.fetch_one(self.TAKE_SQL, key, float(rule.burst), float(rule.rate), use_primary=True)
+        return 0.0 if row else 1 / rule.rate
+
+
+class RateLimiter:
+    """Rule table + bucket store + a local memo of denied clients (so repeat denials are free)."""
+
+    def __init__(self, rules: Dict[Tuple[str, str], RateRule], store=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.rules = rules
+        self.store = store or MemoryBucketStore()
+        self.enabled = enabled
+        self._denied_until: Dict[str, float] = {}
+        self.stats = {"allowed": 0, "rejected": 0, "store_errors": 0}
+
+    async def check(self, rule: RateRule, client: str) -> float:
+        """Return 0 to admit the request, otherwise seconds until the client may retry."""
+        key = f"{rule.name}|{client}"
+        now = time.monotonic()
+        until = self._denied_until.get(key)
+        if until is not None:
+            if until > now:
+                self.stats["rejected"] += 1
+                return until - now
+            del self._denied_until[key]
+
+        try:
+            retry_after = await self.store.take(key, rule)
+        except Exception:
+            # Fail open: a broken shared store must not take the API down with it
+            self.stats["store_errors"] += 1
+            return 0.0
+
+        if retry_after > 0:
+            self.stats["rejected"] += 1
+            if len(self._denied_until) > RATE_LIMIT_MAX_KEYS:
+                self._denied_until.clear()
+            self._denied_until[key] = now + retry_after
+            return retry_after
+        self.stats["allowed"] += 1
+        return 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "store": type(self.store).__name__,
+            "rules": {r.name: {"per_second": round(r.rate, 4), "burst": r.burst} for r in self.rules.values()},
+        }
+
+
+def client_key(scope, api_keys: frozenset = RATE_LIMIT_API_KEYS, trusted_hops: int = RATE_LIMIT_TRUST_PROXY) -> str:
+    """
+    A configured X-API-Key when present, otherwise the client IP. With `trusted_hops` proxies
+    in front, the IP is the X-Forwarded-For entry the outermost one appended; a header with
+    fewer entries didn't come through them, so the peer address is used instead.
+    Keys are hashed so raw keys never reach the (possibly shared) bucket store.
+    """
+    forwarded = []
+    for name, value in scope.get("headers", ()):
+        if name == b"x-api-key" and value in api_keys:
+            return "key:" + hashlib.blake2b(value, digest_size=8).hexdigest()
+        if name == b"x-forwarded-for":  # Repeated headers form one list, in order
+            forwarded.extend(part.strip() for part in value.decode("latin-1").split(","))
+    if trusted_hops > 0 and len(forwarded) >= trusted_hops and forwarded[-trusted_hops]:
+        return "ip:" + forwarded[-trusted_hops]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+TOO_MANY_REQUESTS_BODY = json.dumps({"detail": "Too many requests; slow down"}).encode()
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware; requests without a matching rule pass through untouched."""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            return await self.app(scope, receive, send)
+        rule = self.limiter.rules.get((scope["method"], scope["path"]))
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        retry_after = await self.limiter.check(rule, client_key(scope))
+        if not retry_after:
+            return await self.app(scope, receive, send)
+
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(TOO_MANY_REQUESTS_BODY)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": TOO_MANY_REQUESTS_BODY})
@@ -1,29 +1,191 @@
 
 # backend/services/report_service.py - Selects appropriate report based on user selections of age-class and health issues.
+# Report rules live in report_rules.json (REPORT_RULES_PATH), so adding a report variant is a
+# config change. At load time the rules are compiled into a decision table indexed by
+# (status bitmask, age band, size band): picking a report is then one array lookup, and
+# whole columns of historical submissions can be rescored at once with NumPy.
 
-def choose_report(status_dietRelat_preReg, breed):  # Function takes list of health statuses and breed name as inputs
+import json
+import os
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+REPORT_RULES_PATH = os.getenv(
+    "REPORT_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_rules.json")
+)
+
+UNLISTED = "unlisted"  # Pseudo-status for selections outside the configured vocabulary
+MAX_STATUS_BITS = 16  # Keeps the decision table small (2**16 masks x bands)
+
+
+class ReportRuleEngine:
+    """
+    Compiled report rules.
+
+    Each submission is encoded as (status bitmask, age band index, size band index); the
+    decision table maps every possible combination to the index of the winning report.
+    """
+
+    def __init__(self, config: dict):
+        self.statuses: List[str] = [s.lower() for s in config["statuses"]] + [UNLISTED]
+        if len(self.statuses) > MAX_STATUS_BITS:
+            raise ValueError(f"At most {MAX_STATUS_BITS - 1} statuses are supported")
+        self.status_bit = {s: 1 << i for i, s in enumerate(self.statuses)}
+
+        # Upper bounds for np.searchsorted (the open-ended last band has none); an implicit
+        # trailing "unknown" band is used when no age was given
+        self.age_bands = [b["name"].lower() for b in config["age_bands"]] + ["unknown"]
+        self.age_bounds = np.array([b["max_years"] for b in config["age_bands"][:-1]], dtype=np.float64)
+        self.size_bands = [s.lower() for s in config["size_bands"]]
+        if "unknown" not in self.size_bands:
+            self.size_bands.append("unknown")
+        self.size_index = {s: i for i, s in enumerate(self.size_bands)}
+
+        # Reports: configured rules in priority order, then the default
+        self.reports = [
+            {"report": r["report"], "message": r["message"]} for r in config.get("rules", [])
+        ] + [{"report": config["default"]["report"], "message": config["default"]["message"]}]
+        self.table = self._compile(config.get("rules", []))
+
+    def _mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            name = name.lower()
+            if name not in self.status_bit:
+                raise ValueError(f"Unknown status in report rules: {name!r}")
+            mask |= self.status_bit[name]
+        return mask
+
+    def _band_mask(self, names: Optional[Sequence[str]], bands: List[str]) -> int:
+        if names is None:
+            return (1 << len(bands)) - 1
+        return sum(1 << bands.index(n.lower()) for n in names)
+
+    def _compile(self, rules: list) -> np.ndarray:
+        """Evaluate every rule for every (mask, age band, size band) once -> int16 table of report indexes."""
+        n_masks = 1 << len(self.statuses)
+        masks = np.arange(n_masks)[:, None, None]
+        ages = np.arange(len(self.age_bands))[None, :, None]
+        sizes = np.arange(len(self.size_bands))[None, None, :]
+        shape = (n_masks, len(self.age_bands), len(self.size_bands))
+
+        table = np.full(shape, len(self.reports) - 1, dtype=np.int16)  # Default report
+        decided = np.zeros(shape, dtype=bool)
+        for index, rule in enumerate(rules):
+            match = np.ones(shape, dtype=bool)
+            if "statuses_within" in rule:
+                match &= (masks & ~self._mask(rule["statuses_within"])) == 0
+            if "any_status" in rule:
+                match &= (masks & self._mask(rule["any_status"])) != 0
+            if "all_statuses" in rule:
+                required = self._mask(rule["all_statuses"])
+                match &= (masks & required) == required
+            match &= ((self._band_mask(rule.get("age_bands"), self.age_bands) >> ages) & 1).astype(bool)
+            match &= ((self._band_mask(rule.get("size_bands"), self.size_bands) >> sizes) & 1).astype(bool)
+            new = match & ~decided  # First matching rule wins
+            table[new] = index
+            decided |= new
+        return table
+
+    # ---------- encoding ----------
+
+    def status_mask(self, statuses: Optional[Iterable[str]]) -> int:
+        """Bitmask for one submission's statuses (empty selection = 'none')."""
+        mask = 0
+        for s in statuses or ("none",):
+            mask |= self.status_bit.get(s.strip().lower(), self.status_bit[UNLISTED])
+        return mask or self.status_bit["none"]
+
+    def age_band(self, age_years: Optional[float]) -> int:
+        if age_years is None:
+            return len(self.age_bands) - 1
+        return int(np.searchsorted(self.age_bounds, age_years, side="right"))
+
+    def size_band(self, size: Optional[str]) -> int:
+        return self.size_index.get((size or "unknown").strip().lower(), self.size_index["unknown"])
+
+    # ---------- evaluation ----------
+
+    def report_index(self, statuses, age_years: Optional[float] = None, size: Optional[str] = None) -> int:
+        """Index into `reports` of the winning report for one submission."""
+        return int(self.table[self.status_mask(statuses), self.age_band(age_years), self.size_band(size)])
+
+    def evaluate(self, statuses, age_years: Optional[float] = None, size: Optional[str] = None) -> dict:
+        """Report for one submission: {'report': name, 'message': template}."""
+        return self.reports[self.report_index(statuses, age_years, size)]
+
+    def render(self, report_index: int, breed: str) -> dict:
+        """Finished report for a decision-table result: {'report': name, 'message': text with the breed filled in}."""
+        report = self.reports[report_index]
+        return {"report": report["report"], "message": report["message"].format(breed=breed)}
+
+    def encode_batch(self, status_lists, ages=None, sizes=None):
+        """Encode many submissions into (masks, age band indexes, size band indexes) arrays (None = unknown)."""
+        masks = np.fromiter((self.status_mask(s) for s in status_lists), dtype=np.int64)
+        n = len(masks)
+        if ages is None:
+            age_idx = np.full(n, self.age_band(None), dtype=np.int64)
+        else:
+            ages = np.array([np.nan if a is None else a for a in ages], dtype=np.float64)
+            age_idx = np.searchsorted(self.age_bounds, ages, side="right")
+            age_idx[np.isnan(ages)] = self.age_band(None)  # Missing (NULL) ages
+        if sizes is None:
+            size_idx = np.full(n, self.size_index["unknown"], dtype=np.int64)
+        else:
+            size_idx = np.fromiter((self.size_band(s) for s in sizes), dtype=np.int64)
+        return masks, age_idx, size_idx
+
+    def evaluate_batch(self, masks: np.ndarray, age_idx: np.ndarray, size_idx: np.ndarray) -> np.ndarray:
+        """Vectorized lookup: report index per submission (see `reports` for names/messages)."""
+        return self.table[masks, age_idx, size_idx]
+
+    def snapshot(self) -> dict:
+        return {
+            "statuses": self.statuses,
+            "age_bands": self.age_bands,
+            "size_bands": self.size_bands,
+            "reports": [r["report"] for r in self.reports],
+            "table_entries": int(self.table.size),
+        }
+
+
+def load_report_rules(path: str = REPORT_RULES_PATH) -> ReportRuleEngine:
+    """Read and compile the rules file (raises on invalid config, so bad edits fail at startup)."""
+    with open(path, encoding="utf-8") as f:
+        return ReportRuleEngine(json.load(f))
+
+
+# Compiled once at import; reload with reload_report_rules() after editing the rules file
+report_rules = load_report_rules()
+
+
+def reload_report_rules(path: str = REPORT_RULES_PATH) -> ReportRuleEngine:
+    """Recompile the rules file and swap it in (the old engine stays active if it's invalid)."""
+    global report_rules
+    report_rules = load_report_rules(path)
+    return report_rules
+
+
+def select_report(status_dietRelat_preReg, breed, age_years=None, size=None) -> dict:
+    """Report for one submission: {'report': name, 'message': text with the breed filled in}."""
+    engine = report_rules
+    return engine.render(engine.report_index(status_dietRelat_preReg, age_years, size), breed)
+
+
+def choose_report(status_dietRelat_preReg, breed, age_years=None, size=None):  # Function takes list of health statuses and breed name as inputs
     """
     Determines which report/recommendation to provide based on dog's health status.
-    
+
     Args:
         status_dietRelat_preReg: List of diet-related health statuses (e.g., ['none'], ['puppy', 'allergy'])
         breed: Dog breed name (e.g., 'Labrador Retriever')
-    
+        age_years / size: optional age and breed size category, for rules that use bands
+
     Returns:
         String message indicating which type of report/recommendation to provide
     """
-    # Normalize text (optional but helpful for beginners)
-    status_dietRelat_preReg = [s.lower() for s in status_dietRelat_preReg]  # Convert all selections to lowercase for consistent comparison
-    
-    # Condition 1: Only none/puppy
-    allowed = {"none", "puppy"}  # Define which selections count as "basic" (no special health concerns)
-    if set(status_dietRelat_preReg).issubset(allowed):  # Check if ALL selections are only "none" and/or "puppy"
-        report_name = "Report_basic_foodP1"  # Assign report name for tracking/logging
-        return f"Info related to puppy or adult food for {breed}"  # Return basic nutrition report message
-    
-    # Condition 2: Any other health issues AT ALL
-    report_name = "Report_enhanced_vet"  # Assign report name for special dietary needs - "Report... adjusted; targeted; advanced
-    return f"Info related to health issues and/or pregnant female or senior"  # Return special health report message
+    return select_report(status_dietRelat_preReg, breed, age_years, size)["message"]
 
 
 # Example Use
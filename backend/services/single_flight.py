@@ -0,0 +1,53 @@
+# backend/services/single_flight.py - Coalesce concurrent identical async calls
+# While a call for a key is in flight, later callers with the same key await the same
+# result instead of starting their own call (one upstream request per key at a time).
+# Used by: backend/services/chat_services.py (identical AI question profiles)
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time and shares its outcome with every caller.
+
+    The shared call runs in its own task, so:
+    - a caller that is cancelled (client disconnect) stops waiting, but the call keeps
+      running for the other callers (and still finishes any side effects such as caching);
+    - a failed call raises the same exception to every waiting caller, and the key is
+      released so the next caller starts a fresh attempt.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def _release(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved so an unobserved failure isn't logged as "never retrieved"
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Return the shared task for `key`, starting fn() in it if no call is in flight."""
+        task = self._calls.get(key)
+        if task is None:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+        else:
+            self.stats["followers"] += 1
+        return task
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of fn(), shared with concurrent callers using the same key."""
+        # shield: cancelling this caller must not cancel the shared task
+        return await asyncio.shield(self.start(key, fn))
+
+    def is_running(self, key: str) -> bool:
+        """True while a call for `key` is in flight."""
+        return key in self._calls
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "in_flight": len(self._calls)}
@@ -0,0 +1,185 @@
+# backend/services/static_assets.py - Cache-friendly serving of the static frontend
+# At startup every file under frontend/public is hashed and gets a fingerprinted URL
+# (style.css -> style.3f2a9c1be0.css). Fingerprinted URLs never change content, so they are
+# sent with a one-year immutable Cache-Control and browsers don't even revalidate them;
+# index.html is rewritten to point at them and is itself served with no-cache + ETag, so a
+# repeat visit costs one 304 for the page and nothing for the assets. Text assets are
+# compressed once at startup (gzip, plus brotli when the optional `brotli` package is
+# installed) and served in the best encoding the client accepts.
+# Used by: backend/main.py (GET / and GET /public/{path})
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+try:  # Optional: brotli is ~15-20% smaller than gzip for CSS/JS/HTML
+    import brotli
+except ImportError:  # pragma: no cover - depends on the deployment
+    brotli = None
+
+STATIC_IMMUTABLE_MAX_AGE = int(os.getenv("STATIC_IMMUTABLE_MAX_AGE", str(365 * 24 * 3600)))
+STATIC_PRECOMPRESS_MAX_BYTES = int(os.getenv("STATIC_PRECOMPRESS_MAX_BYTES", str(2 * 1024 * 1024)))
+STATIC_MIN_COMPRESS_BYTES = 512  # Smaller bodies aren't worth the Content-Encoding overhead
+
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/plain", "text/javascript", "application/javascript",
+    "application/json", "image/svg+xml",
+}
+IMMUTABLE_CACHE = f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+REVALIDATE_CACHE = "no-cache"  # Always revalidate (cheap: If-None-Match -> 304)
+
+# src="..." / href="..." attributes in index.html
+_ASSET_ATTR = re.compile(r'(?P<attr>\b(?:src|href))=(?P<quote>["\'])(?P<url>[^"\']+)(?P=quote)')
+
+
+class StaticAsset:
+    """One servable file: validators, media type and (for text) its encoded bodies."""
+
+    __slots__ = ("path", "media_type", "etag_hash", "mtime", "last_modified", "bodies")
+
+    def __init__(self, path: str, content: bytes, mtime: float, media_type: str):
+        self.path = path
+        self.media_type = media_type
+        self.etag_hash = hashlib.blake2b(content, digest_size=8).hexdigest()
+        self.mtime = int(mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        # encoding -> body; None means "stream the file from disk" (large or binary files)
+        self.bodies: Optional[Dict[str, bytes]] = None
+        compressible = media_type.split(";")[0] in COMPRESSIBLE_TYPES
+        if compressible and len(content) <= STATIC_PRECOMPRESS_MAX_BYTES:
+            self.bodies = {"identity": content}
+            if len(content) >= STATIC_MIN_COMPRESS_BYTES:
+                candidates = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    candidates["br"] = brotli.compress(content, quality=11)
+                # Keep an encoding only if it actually saves bytes
+                self.bodies.update((enc, body) for enc, body in candidates.items() if len(body) < len(content))
+
+    def etag(self, encoding: str) -> str:
+        # Each encoding is a different byte sequence, so it gets its own strong validator
+        return f'"{self.etag_hash}"' if encoding == "identity" else f'"{self.etag_hash}-{encoding}"'
+
+
+def fingerprinted_name(relative_path: str, etag_hash: str) -> str:
+    """assets/logo.jpeg + hash -> assets/logo.<first 10 hex chars>.jpeg"""
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}.{etag_hash[:10]}{ext}"
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    return accepted
+
+
+class StaticAssets:
+    """
+    Manifest of frontend/public plus the rewritten index.html.
+    Built once (at import in main.py); restart the app after changing frontend files.
+    """
+
+    def __init__(self, public_dir: str, index_path: str, url_prefix: str = "/public/"):
+        self.public_dir = public_dir
+        self.url_prefix = url_prefix
+        self.assets: Dict[str, Tuple[StaticAsset, bool]] = {}  # URL path under prefix -> (asset, immutable)
+        self.manifest: Dict[str, str] = {}  # original relative path -> fingerprinted relative path
+        for dirpath, _, filenames in os.walk(public_dir):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, public_dir).replace(os.sep, "/")
+                asset = self._load(path)
+                fingerprinted = fingerprinted_name(relative, asset.etag_hash)
+                self.manifest[relative] = fingerprinted
+                self.assets[relative] = (asset, False)  # Old URLs keep working, with revalidation
+                self.assets[fingerprinted] = (asset, True)
+
+        with open(index_path, encoding="utf-8") as f:
+            html = _ASSET_ATTR.sub(self._rewrite_attr, f.read()).encode("utf-8")
+        self.index = StaticAsset(index_path, html, os.stat(index_path).st_mtime, "text/html; charset=utf-8")
+
+    def _load(self, path: str) -> StaticAsset:
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        with open(path, "rb") as f:
+            content = f.read()  # Read once to hash; only text bodies are kept in memory
+        return StaticAsset(path, content, os.stat(path).st_mtime, media_type)
+
+    def _rewrite_attr(self, match: re.Match) -> str:
+        """Point ./public/... (and .\\public\\...) references at their fingerprinted URLs."""
+        url = match.group("url").replace("\\", "/")
+        relative = re.sub(r"^(\./|/)?public/", "", url, count=1)
+        if relative == url or relative not in self.manifest:
+            return match.group(0)  # External, missing or not under public/: leave as written
+        quote = match.group("quote")
+        return f'{match.group("attr")}={quote}{self.url_prefix}{self.manifest[relative]}{quote}'
+
+    # ---------- responses ----------
+
+    def response(self, request: Request, relative_path: str) -> Response:
+        """Response for GET/HEAD /public/<relative_path> (404 for anything not in the manifest)."""
+        found = self.assets.get(relative_path)
+        if found is None:
+            return Response(status_code=404)
+        asset, immutable = found
+        return self._serve(request, asset, IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE)
+
+    def index_response(self, request: Request) -> Response:
+        return self._serve(request, self.index, REVALIDATE_CACHE)
+
+    def _not_modified(self, request: Request, asset: StaticAsset) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # Any encoding's validator proves the client has the current content
+            tags = {t.strip().removeprefix("W/").strip('"') for t in if_none_match.split(",")}
+            return "*" in tags or any(t.split("-")[0] == asset.etag_hash for t in tags)
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return asset.mtime <= int(parsedate_to_datetime(if_modified_since).timestamp())
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _serve(self, request: Request, asset: StaticAsset, cache_control: str) -> Response:
+        encoding = "identity"
+        if asset.bodies is not None and len(asset.bodies) > 1:
+            accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+            for candidate in ("br", "gzip"):  # Smallest first
+                if candidate in asset.bodies and accepted.get(candidate, 0) > 0:
+                    encoding = candidate
+                    break
+
+        headers = {
+            "cache-control": cache_control,
+            "etag": asset.etag(encoding),
+            "last-modified": asset.last_modified,
+        }
+        if asset.bodies is not None and len(asset.bodies) > 1:
+            headers["vary"] = "Accept-Encoding"
+
+        if self._not_modified(request, asset):
+            return Response(status_code=304, headers=headers)
+        if asset.bodies is None:
+            # Large/binary files stream from disk (FileResponse also handles Range requests)
+            return FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+        if encoding != "identity":
+            headers["content-encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.media_type, headers=headers)
@@ -0,0 +1,282 @@
+# backend/services/submission_buffer.py - Write-behind buffer for questionnaire submissions
+# Collects submitted rows in memory and writes them to Postgres in batches (by size or time),
+# so /api/submit-dog-info no longer needs one pool connection and one INSERT per request.
+# Used by: backend/main.py (started/flushed in lifespan, fed by submit_dog_info)
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+# Tunables (environment overrides keep deployments configurable without code changes)
+SUBMIT_BUFFER_MAX_BATCH = int(os.getenv("SUBMIT_BUFFER_MAX_BATCH", "500"))  # Flush as soon as this many rows wait
+SUBMIT_BUFFER_FLUSH_SECONDS = float(os.getenv("SUBMIT_BUFFER_FLUSH_SECONDS", "0.5"))  # ...or after this long
+SUBMIT_BUFFER_MAX_PENDING = int(os.getenv("SUBMIT_BUFFER_MAX_PENDING", "5000"))  # Buffer capacity (backpressure point)
+SUBMIT_BUFFER_WAIT_SECONDS = float(os.getenv("SUBMIT_BUFFER_WAIT_SECONDS", "2"))  # How long a caller waits for space
+SUBMIT_BUFFER_MAX_ATTEMPTS = int(os.getenv("SUBMIT_BUFFER_MAX_ATTEMPTS", "3"))  # Failed writes before a row is dead-lettered
+SUBMIT_BUFFER_DEAD_LETTER_MAX = int(os.getenv("SUBMIT_BUFFER_DEAD_LETTER_MAX", "1000"))  # Dead letters kept in memory
+
+
+class SubmissionBufferFull(Exception):
+    """Raised when the buffer stays full longer than the caller is willing to wait."""
+
+
+class SubmissionBufferUnavailable(Exception):
+    """Raised for new submits while buffered rows can't be written (the database is unreachable)."""
+
+
+class SubmissionBufferClosed(Exception):
+    """Set on durable submits that were still queued when shutdown gave up writing them."""
+
+
+class SubmissionBuffer:
+    """
+    In-memory write-behind queue.
+
+    - submit() appends a row and returns immediately (fast-ack), or waits for the
+      batch containing the row to be committed when durable=True (durable-ack).
+    - A background task flushes up to `max_batch` rows at a time through `flush_fn`.
+    - When `max_pending` rows are waiting, submit() blocks for up to `wait_seconds`
+      and then raises SubmissionBufferFull so the route can answer 503.
+    - A batch that fails with a `transient_errors` exception (database unreachable) is
+      re-queued whole and retried on the next tick; until a write succeeds again, submit()
+      raises SubmissionBufferUnavailable instead of acknowledging rows that may never be
+      written. Any other error means some row is bad:
+      the batch is split in halves until the failing rows are isolated, the good rows are
+      written, and a row that has failed `max_attempts` times goes to the dead-letter store
+      (`dead_letters`, plus `dead_letter_fn` when given) instead of blocking the queue.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[tuple]], Awaitable[None]],
+        max_batch: int = SUBMIT_BUFFER_MAX_BATCH,
+        flush_seconds: float = SUBMIT_BUFFER_FLUSH_SECONDS,
+        max_pending: int = SUBMIT_BUFFER_MAX_PENDING,
+        wait_seconds: float = SUBMIT_BUFFER_WAIT_SECONDS,
+        max_attempts: int = SUBMIT_BUFFER_MAX_ATTEMPTS,
+        transient_errors: Tuple[Type[BaseException], ...] = (OSError, asyncio.TimeoutError),
+        dead_letter_fn: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    ):
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.wait_seconds = wait_seconds
+        self.max_attempts = max_attempts
+        self.transient_errors = transient_errors
+        self.dead_letter_fn = dead_letter_fn
+
+        # Each entry is (record, future-or-None, failed attempts); the future is set for durable submits
+        self._pending: Deque[Tuple[tuple, Optional[asyncio.Future], int]] = deque()
+        self._wakeup = asyncio.Event()  # Set when a full batch is ready or on shutdown
+        self._space = asyncio.Condition()  # Notified after a flush frees capacity
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._last_error: Optional[Exception] = None
+        self._failing = False  # Last write hit a transient error and rows are waiting to be retried
+        self.dead_letters: Deque[dict] = deque(maxlen=SUBMIT_BUFFER_DEAD_LETTER_MAX)
+        self.stats = {"rows_written": 0, "failed_writes": 0, "dead_lettered": 0, "dropped_at_shutdown": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        """Start the background flusher (call from FastAPI lifespan startup)."""
+        if not self.running:
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="submission-buffer-flusher")
+
+    async def stop(self) -> int:
+        """
+        Flush everything still buffered and stop the flusher (lifespan shutdown).
+        Returns how many acknowledged (non-durable) rows could not be written, i.e. were
+        dropped or dead-lettered during shutdown.
+        """
+        lost_before = self.stats["dropped_at_shutdown"] + self.stats["dead_lettered"]
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        # Anything left (e.g. the flusher died on an error) gets one last direct attempt
+        if self._pending and not await self._flush_all():
+            self._abandon_pending()
+        return self.stats["dropped_at_shutdown"] + self.stats["dead_lettered"] - lost_before
+
+    # ---------- producer API ----------
+
+    async def submit(self, record: tuple, durable: bool = False):
+        """
+        Queue one row for insertion.
+
+        Args:
+            record: tuple in the column order expected by `flush_fn`
+            durable: if True, return only after the row has been written (errors propagate)
+
+        Raises:
+            SubmissionBufferUnavailable: buffered rows are failing to write; nothing was queued
+            SubmissionBufferFull: no space freed up within `wait_seconds`
+        """
+        if self._failing:
+            raise SubmissionBufferUnavailable(f"Submissions can't be saved right now ({self._last_error}); try again shortly")
+        if not self.running:
+            # No flusher (startup failed or buffer not started): write straight through
+            await self.flush_fn([record])
+            return
+
+        if len(self._pending) >= self.max_pending:
+            await self._wait_for_space()
+
+        future = asyncio.get_running_loop().create_future() if durable else None
+        self._pending.append((record, future, 0))
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+        if future is not None:
+            await future
+
+    async def _wait_for_space(self):
+        async with self._space:
+            try:
+                await asyncio.wait_for(
+                    self._space.wait_for(lambda: len(self._pending) < self.max_pending),
+                    timeout=self.wait_seconds,
+                )
+            except asyncio.TimeoutError:
+                raise SubmissionBufferFull("Submission buffer is full; try again shortly")
+
+    # ---------- flusher ----------
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass  # Time-based flush
+            self._wakeup.clear()
+
+            # On failure, back off until the next tick instead of hammering the database
+            ok = await self._flush_all()
+
+            if self._closing:
+                if not ok:
+                    self._abandon_pending()  # Don't spin forever on shutdown
+                if not self._pending:
+                    return
+
+    async def _flush_all(self) -> bool:
+        """Flush batches until the queue is empty. Returns False if a batch was re-queued."""
+        while self._pending:
+            if not await self._flush_once():
+                return False
+        return True
+
+    async def _flush_once(self) -> bool:
+        """Write one batch. Returns False if any of its rows had to be re-queued."""
+        batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+        retry: List[Tuple[tuple, Optional[asyncio.Future], int]] = []
+        await self._write(batch, retry)
+        # Re-queued rows go back to the front, in their original order
+        self._pending.extendleft(reversed(retry))
+        if not self._pending:
+            self._failing = False  # Nothing left to retry; the next submit finds out whether writes work
+        async with self._space:
+            self._space.notify_all()
+        return not retry
+
+    async def _write(self, batch, retry: list):
+        """Write `batch`, splitting it to isolate bad rows; rows to try again are appended to `retry`."""
+        try:
+            await self.flush_fn([record for record, _, _ in batch])
+        except Exception as exc:
+            self.stats["failed_writes"] += 1
+            self._last_error = exc
+            if isinstance(exc, self.transient_errors):
+                # The database is unreachable, not the data bad: keep every row, count no attempt
+                logger.warning("Submission buffer flush of %d rows failed (will retry): %s", len(batch), exc)
+                self._failing = True
+                self._requeue(batch, exc, retry, count_attempt=False)
+            elif len(batch) > 1:
+                middle = len(batch) // 2
+                await self._write(batch[:middle], retry)
+                await self._write(batch[middle:], retry)
+            else:
+                logger.error("Submission row rejected by the database: %r (%s)", batch[0][0], exc)
+                dead = self._requeue(batch, exc, retry, count_attempt=True)
+                if dead:
+                    await self._dead_letter(dead)
+            return
+
+        self.stats["rows_written"] += len(batch)
+        self._failing = False
+        for _, future, _ in batch:
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    def _requeue(self, batch, exc: Exception, retry: list, count_attempt: bool) -> List[dict]:
+        """
+        Durable callers get the error (and may retry themselves); fire-and-forget rows are
+        re-queued so they are not lost, until a row has failed `max_attempts` times on its own.
+        Returns the dead-letter entries for rows that are given up on.
+        """
+        dead = []
+        for record, future, attempts in batch:
+            if future is not None:
+                if not future.done():
+                    future.set_exception(exc)
+                continue
+            attempts += count_attempt
+            if attempts >= self.max_attempts or (count_attempt and self._closing):
+                dead.append({
+                    "record": record,
+                    "error": f"{type(exc).__name__}: {exc}",
+                    "attempts": attempts,
+                    "failed_at": time.time(),
+                })
+            else:
+                retry.append((record, None, attempts))
+        return dead
+
+    async def _dead_letter(self, entries: List[dict]):
+        """Keep rejected rows out of the queue: in memory always, and in `dead_letter_fn` when set."""
+        for entry in entries:
+            logger.error("Dead-lettered submission after %d failed writes: %r", entry["attempts"], entry["record"])
+        self.dead_letters.extend(entries)
+        self.stats["dead_lettered"] += len(entries)
+        if self.dead_letter_fn is not None:
+            try:
+                await self.dead_letter_fn(entries)
+            except Exception as exc:
+                logger.warning("Could not persist %d dead-lettered submissions (kept in memory): %s", len(entries), exc)
+
+    def _abandon_pending(self):
+        """Shutdown could not write the remaining rows: fail durable waiters and report the loss."""
+        exc = SubmissionBufferClosed(f"Submission not written before shutdown: {self._last_error}")
+        dropped = 0
+        while self._pending:
+            record, future, _ = self._pending.popleft()
+            if future is not None:
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                dropped += 1
+        if dropped:
+            self.stats["dropped_at_shutdown"] += dropped
+            logger.error("Dropping %d buffered submissions at shutdown: %s", dropped, self._last_error)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "running": self.running,
+            "failing": self._failing,
+            "dead_letters_kept": len(self.dead_letters),
+        }
@@ -0,0 +1,227 @@
+# backend/services/submission_rollups.py - Hourly submission counts for analytics dashboards
+# Counts questionnaire submissions per (hour, breed, age band, status) in a small rollup
+# table. A refresh only reads rows newer than a watermark on DateTime_preReg, so it costs
+# O(new rows); dashboard reads sum rollup rows, so they cost O(buckets), never O(submissions).
+# Used by: backend/main.py (refresh loop in lifespan, GET /api/analytics/submissions, admin refresh)
+#
+# Tables (created automatically at startup; also listed in schemas/TABLE_CREATE.sql):
+#   submission_rollup_hourly  one row per (bucket, breed, age band, status); status '*' counts
+#                             every submission once (a dog with two statuses is in both status rows)
+#   submission_rollup_state   the watermark: every row with DateTime_preReg < watermark is counted
+
+import asyncio
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from .ai_cache import AGE_BANDS
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_ENABLED = os.getenv("ROLLUP_ENABLED", "1") == "1"
+ROLLUP_REFRESH_SECONDS = float(os.getenv("ROLLUP_REFRESH_SECONDS", "60"))  # Background refresh period
+# Rows younger than this are left for the next refresh, so a slow transaction that commits a
+# row stamped just before the watermark isn't skipped (DateTime_preReg is the insert time)
+ROLLUP_SETTLE_SECONDS = float(os.getenv("ROLLUP_SETTLE_SECONDS", "10"))
+
+ALL_STATUSES = "*"  # Status value of the per-submission total rows
+ROLLUP_DIMENSIONS = {"breed": "breed_name_AKC", "age_band": "age_band", "status": "status"}
+ROLLUP_GRANULARITIES = ("hour", "day", "week", "month")
+
+
+def age_band_sql(column: str) -> str:
+    """SQL CASE mapping an age column to the short life-stage band names of ai_cache.AGE_BANDS."""
+    cases = " ".join(
+        f"WHEN {column} < {upper} THEN '{label.split()[0]}'"
+        for upper, label in AGE_BANDS if upper != float("inf")
+    )
+    return f"CASE WHEN {column} IS NULL THEN 'unknown' {cases} ELSE '{AGE_BANDS[-1][1].split()[0]}' END"
+
+
+@lru_cache(maxsize=64)
+def build_rollup_query(group_by: Tuple[str, ...]) -> str:
+    """
+    Read query over the rollup table for one combination of grouping dimensions.
+    Parameters: $1 granularity, $2 since, $3 until, $4 breed, $5 age band, $6 status (NULL = any).
+    """
+    columns = "".join(f", {ROLLUP_DIMENSIONS[d]} AS {d}" for d in group_by)
+    positions = ", ".join(str(i) for i in range(1, len(group_by) + 2))
+    # Without a status breakdown, read the per-submission total rows so dogs aren't counted twice
+    status_filter = (
+        f"status <> '{ALL_STATUSES}' AND ($6::text IS NULL OR status = $6)" if "status" in group_by
+        else f"status = COALESCE($6, '{ALL_STATUSES}')"
+    )
+    return f"""SELECT date_trunc($1, bucket) AS bucket{columns}, SUM(submissions)::bigint AS submissions
+               FROM submission_rollup_hourly
+               WHERE ($2::timestamp IS NULL OR bucket >= date_trunc('hour', $2::timestamp))
+                 AND ($3::timestamp IS NULL OR bucket < $3)
+                 AND ($4::text IS NULL OR breed_name_AKC = $4)
+                 AND ($5::text IS NULL OR age_band = $5)
+                 AND {status_filter}
+               GROUP BY {positions}
+               ORDER BY {positions}"""
+
+
+class SubmissionRollups:
+    """
+    Watermark-driven rollup of questions_home_dog_4Q_v2.
+    Takes the database helpers as arguments so this module doesn't import models/.
+    """
+
+    CREATE_SQL = (
+        """CREATE TABLE IF NOT EXISTS submission_rollup_hourly (
+               bucket TIMESTAMP NOT NULL,
+               breed_name_AKC TEXT NOT NULL,
+               age_band TEXT NOT NULL,
+               status TEXT NOT NULL,
+               submissions BIGINT NOT NULL,
+               PRIMARY KEY (bucket, breed_name_AKC, age_band, status)
+           )""",
+        """CREATE TABLE IF NOT EXISTS submission_rollup_state (
+               name TEXT PRIMARY KEY,
+               watermark TIMESTAMP NOT NULL,
+               refreshed_at TIMESTAMPTZ
+           )""",
+        """INSERT INTO submission_rollup_state (name, watermark) VALUES ('questionnaires', '-infinity')
+           ON CONFLICT (name) DO NOTHING""",
+    )
+
+    # Statuses of questionnaire row q from the comma-joined text column
+    STATUS_TEXT_SQL = """ARRAY(SELECT lower(btrim(s))
+                               FROM unnest(string_to_array(q.status_dietRelat_preReg, ',')) AS s
+                               WHERE btrim(s) <> '')"""
+    # ...preferring the MIGRATION_001 array; rows the backfill hasn't reached yet only have the text
+    STATUS_ARRAY_SQL = f"CASE WHEN q.statuses_preReg IS NOT NULL THEN q.statuses_preReg ELSE {STATUS_TEXT_SQL} END"
+
+    # $1 settle seconds. One statement: lock the watermark row (serializes workers), count the
+    # rows in [watermark, now - settle) into the rollup, advance the watermark.
+    # {statuses} is STATUS_ARRAY_SQL, or STATUS_TEXT_SQL before the migration adds the column.
+    REFRESH_SQL = f"""
+        WITH bounds AS (
+            SELECT watermark AS lo, LOCALTIMESTAMP - make_interval(secs => $1) AS hi
+            FROM submission_rollup_state WHERE name = 'questionnaires'
+            FOR UPDATE
+        ), advanced AS (
+            UPDATE submission_rollup_state s SET watermark = b.hi, refreshed_at = now()
+            FROM bounds b
+            WHERE s.name = 'questionnaires' AND b.hi > b.lo
+            RETURNING b.lo, b.hi
+        ), counted AS (
+            INSERT INTO submission_rollup_hourly AS r (bucket, breed_name_AKC, age_band, status, submissions)
+            SELECT date_trunc('hour', q.DateTime_preReg), COALESCE(q.breed_name_AKC, ''),
+                   {age_band_sql('q.age_years_preReg')}, st.status, COUNT(*)
+            FROM advanced a
+            JOIN questions_home_dog_4Q_v2 q
+              ON q.DateTime_preReg >= a.lo AND q.DateTime_preReg < a.hi
+            CROSS JOIN LATERAL (
+                SELECT DISTINCT unnest(
+                    ARRAY['{ALL_STATUSES}'] || COALESCE(
+                        NULLIF({{statuses}}, '{{{{}}}}'),
+                        ARRAY['none']  -- No selection counts as 'none', as in the AI profile
+                    )
+                ) AS status
+            ) st
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (bucket, breed_name_AKC, age_band, status)
+            DO UPDATE SET submissions = r.submissions + EXCLUDED.submissions
+            RETURNING 1
+        )
+        SELECT COALESCE((SELECT hi FROM advanced), (SELECT lo FROM bounds)) AS watermark,
+               (SELECT COUNT(*) FROM counted) AS rollup_rows"""
+
+    # Recount from scratch (e.g. after deleting submissions or changing the age bands)
+    REBUILD_SQL = """TRUNCATE submission_rollup_hourly;
+                     UPDATE submission_rollup_state SET watermark = '-infinity', refreshed_at = NULL
+                     WHERE name = 'questionnaires'"""
+
+    def __init__(self, fetch_one, fetch_all, execute_query,
+                 refresh_seconds: float = ROLLUP_REFRESH_SECONDS, settle_seconds: float = ROLLUP_SETTLE_SECONDS):
+        self.fetch_one = fetch_one
+        self.fetch_all = fetch_all
+        self.execute_query = execute_query
+        self.refresh_seconds = refresh_seconds
+        self.settle_seconds = settle_seconds
+        self.status_array = True  # Cleared by main.py when statuses_preReg doesn't exist yet
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"refreshes": 0, "errors": 0, "rows_upserted": 0, "last_refresh_ms": None, "last_error": None}
+
+    async def ensure_tables(self):
+        for sql in self.CREATE_SQL:
+            await self.execute_query(sql)
+
+    async def refresh(self) -> dict:
+        """Fold submissions newer than the watermark into the rollup (no-op when nothing is new)."""
+        started = time.perf_counter()
+        try:
+            statuses = self.STATUS_ARRAY_SQL if self.status_array else self.STATUS_TEXT_SQL
+            row = await self.fetch_one(self.REFRESH_SQL.format(statuses=statuses), self.settle_seconds, use_primary=True)
+        except Exception as exc:
+            self.stats["errors"] += 1
+            self.stats["last_error"] = f"{type(exc).__name__}: {exc}"
+            raise
+        self.stats["refreshes"] += 1
+        self.stats["rows_upserted"] += row["rollup_rows"]
+        self.stats["last_refresh_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return {"watermark": row["watermark"], "rollup_rows": row["rollup_rows"]}
+
+    async def rebuild(self) -> dict:
+        """Drop all rollup rows and recount every submission."""
+        await self.execute_query(self.REBUILD_SQL)
+        return await self.refresh()
+
+    async def watermark(self):
+        row = await self.fetch_one(
+            "SELECT watermark, refreshed_at FROM submission_rollup_state WHERE name = 'questionnaires'"
+        )
+        return (row["watermark"], row["refreshed_at"]) if row else (None, None)
+
+    async def query(self, granularity: str = "day", since=None, until=None, breed: Optional[str] = None,
+                    age_band: Optional[str] = None, status: Optional[str] = None, group_by: Tuple[str, ...] = ()):
+        """Submission counts per time bucket (and per `group_by` dimension), oldest bucket first."""
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(ROLLUP_GRANULARITIES)}")
+        unknown = [d for d in group_by if d not in ROLLUP_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown group_by dimension(s): {', '.join(unknown)}")
+        # Canonical order, so each combination maps to one cached query text (and prepared statement)
+        group_by = tuple(d for d in ROLLUP_DIMENSIONS if d in group_by)
+        status = status.strip().lower() if status else None
+        return await self.fetch_all(
+            build_rollup_query(group_by), granularity, since, until, breed, age_band, status
+        )
+
+    # ---------- background refresh ----------
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Submission rollup refresh failed: %s", exc)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        """Start the periodic refresh (call from FastAPI lifespan startup)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="submission-rollup-refresh")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "running": self._task is not None and not self._task.done(),
+            "refresh_seconds": self.refresh_seconds,
+            "settle_seconds": self.settle_seconds,
+        }
@@ -0,0 +1,277 @@
+# backend/services/vet_retrieval.py - BM25 retrieval over the vet dataset for prompt grounding
+# The dataset rows are indexed once into flat NumPy arrays (a term -> postings layout, like the
+# column side of a CSR matrix) and saved as .npy files. At runtime the files are opened with
+# mmap_mode="r", so the index costs page cache rather than resident heap, and a query is a few
+# array slices plus one np.bincount: milliseconds even for large datasets.
+# Used by: backend/services/chat_services.py (prompt context), backend/main.py (warm-up, stats)
+#
+# Files in VET_INDEX_DIR:
+#   vocab.npy     sorted terms (fixed-width unicode, binary-searched with np.searchsorted)
+#   term_ptr.npy  postings of term i are [term_ptr[i], term_ptr[i + 1])
+#   doc_ids.npy   passage id per posting (int32)
+#   weights.npy   precomputed BM25 weight per posting (float32)
+#   text.npy      all passage text, UTF-8 bytes back to back (uint8)
+#   text_ptr.npy  passage j is text[text_ptr[j]:text_ptr[j + 1]]
+#   meta.json     dataset name/revision and build parameters (rebuild when they change)
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+from .dataset_loader import dataset_fingerprint, dataset_retry_at, file_lock, warm_vet_dataset
+
+VET_INDEX_DIR = os.getenv(
+    "VET_INDEX_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "vet_index")),
+)
+VET_RETRIEVAL_TOP_K = int(os.getenv("VET_RETRIEVAL_TOP_K", "3"))  # Passages added to each prompt
+VET_PASSAGE_MAX_CHARS = int(os.getenv("VET_PASSAGE_MAX_CHARS", "600"))  # Stored (and sent) per passage
+VET_INDEX_RETRY_SECONDS = float(os.getenv("VET_INDEX_RETRY_SECONDS", "300"))  # Wait after a failed build
+VET_INDEX_WAIT_SECONDS = float(os.getenv("VET_INDEX_WAIT_SECONDS", "5"))  # Recheck period while the dataset loads
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_TERM_CHARS = 24  # Longer tokens are truncated (keeps the vocab array fixed-width and small)
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in is it its may my of on or"
+    " should so than that the their them then there these they this to was what when which who will"
+    " with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t[:MAX_TERM_CHARS] for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def row_text(row: dict) -> str:
+    """Passage text for one dataset row: its string columns joined (column names vary by dataset)."""
+    return "\n".join(str(v).strip() for v in row.values() if isinstance(v, str) and v.strip())
+
+
+def _meta() -> dict:
+    return {
+        "version": INDEX_VERSION,
+        "source": dataset_fingerprint(),
+        "passage_max_chars": VET_PASSAGE_MAX_CHARS,
+        "k1": BM25_K1,
+        "b": BM25_B,
+    }
+
+
+def build_vet_index(rows, path: str = VET_INDEX_DIR) -> dict:
+    """
+    Tokenize `rows` (iterable of dicts), compute BM25 weights and save the index under `path`.
+    Callers hold file_lock(path): the directory swap is not safe against another worker
+    building or opening the index at the same time.
+    """
+    term_ids = {}
+    postings_terms, postings_docs, postings_tf = [], [], []
+    doc_lengths, texts = [], []
+
+    for row in rows:
+        text = row_text(row)
+        if not text:
+            continue
+        doc_id = len(texts)
+        texts.append(text[:VET_PASSAGE_MAX_CHARS].encode("utf-8", "ignore"))
+        tokens = tokenize(text)
+        doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings_terms.append(term_ids.setdefault(term, len(term_ids)))
+            postings_docs.append(doc_id)
+            postings_tf.append(tf)
+
+    n_docs = len(texts)
+    terms = np.asarray(postings_terms, dtype=np.int64)
+    docs = np.asarray(postings_docs, dtype=np.int32)
+    tf = np.asarray(postings_tf, dtype=np.float32)
+    doc_len = np.asarray(doc_lengths, dtype=np.float32)
+
+    # Renumber terms in sorted order so the vocab can be binary-searched
+    vocab = np.array(sorted(term_ids, key=term_ids.get), dtype=f"U{MAX_TERM_CHARS}")
+    order_of_term = np.argsort(vocab, kind="stable")
+    vocab = vocab[order_of_term]
+    new_id = np.empty(len(order_of_term), dtype=np.int64)
+    new_id[order_of_term] = np.arange(len(order_of_term))
+    terms = new_id[terms] if len(terms) else terms
+
+    # Group postings by term (CSR-style pointers)
+    order = np.argsort(terms, kind="stable")
+    terms, docs, tf = terms[order], docs[order], tf[order]
+    counts = np.bincount(terms, minlength=len(vocab))
+    term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(counts, out=term_ptr[1:])
+    df = counts.astype(np.float32)  # Documents containing each term
+
+    # BM25 weight per posting, so a query only has to sum weights
+    avgdl = float(doc_len.mean()) if n_docs else 1.0
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[docs] / (avgdl or 1.0))
+    weights = (idf[terms] * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+
+    text_ptr = np.zeros(n_docs + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=text_ptr[1:])
+    text_blob = np.frombuffer(b"".join(texts), dtype=np.uint8)
+
+    # Write to a temp dir and swap it in, so readers never see a half-written index
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(tmp, exist_ok=True)
+        for name, arr in (
+            ("vocab", vocab), ("term_ptr", term_ptr), ("doc_ids", docs),
+            ("weights", weights), ("text", text_blob), ("text_ptr", text_ptr),
+        ):
+            np.save(os.path.join(tmp, f"{name}.npy"), arr)
+        meta = {**_meta(), "documents": n_docs, "terms": len(vocab), "postings": len(docs)}
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        if os.path.isdir(path):
+            old = f"{path}.old-{os.getpid()}"
+            os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)  # Already-open memory maps keep their pages
+        else:
+            os.replace(tmp, path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)  # Only left over when the build failed
+    return meta
+
+
+class VetIndex:
+    """Read-only BM25 index over memory-mapped .npy files."""
+
+    def __init__(self, path: str = VET_INDEX_DIR):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.vocab = load("vocab")
+        self.term_ptr = load("term_ptr")
+        self.doc_ids = load("doc_ids")
+        self.weights = load("weights")
+        self.text = load("text")
+        self.text_ptr = load("text_ptr")
+        self.n_docs = len(self.text_ptr) - 1
+
+    def passage(self, doc_id: int) -> str:
+        return self.text[self.text_ptr[doc_id]:self.text_ptr[doc_id + 1]].tobytes().decode("utf-8", "ignore")
+
+    def search(self, query: str, k: int = VET_RETRIEVAL_TOP_K) -> List[str]:
+        """Top-k passages for `query` by BM25 score (empty when nothing matches)."""
+        terms = np.unique(np.array(tokenize(query), dtype=f"U{MAX_TERM_CHARS}"))
+        if not len(terms) or not self.n_docs or not len(self.vocab):
+            return []
+        pos = np.searchsorted(self.vocab, terms)
+        found = pos < len(self.vocab)
+        found[found] = self.vocab[pos[found]] == terms[found]
+        pos = pos[found]
+        if not len(pos):
+            return []
+        slices = [slice(self.term_ptr[p], self.term_ptr[p + 1]) for p in pos]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        scores = np.bincount(docs, weights=weights, minlength=self.n_docs)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.passage(int(d)) for d in top]
+
+
+# Loaded index (None until the warm-up finishes) and loader state
+_VET_INDEX: Optional[VetIndex] = None
+_load_lock = threading.Lock()
+_warmup_thread: Optional[threading.Thread] = None  # At most one warm-up attempt in flight
+_state = {"status": "idle", "last_error": None, "next_retry_at": 0.0, "build_seconds": None}
+
+
+def _index_matches(path: str = VET_INDEX_DIR) -> bool:
+    """True when `path` holds an index built from the configured dataset with current settings."""
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return all(meta.get(k) == v for k, v in _meta().items())
+
+
+def warm_vet_index():
+    """Load the on-disk index, building it from the dataset first if needed (blocking)."""
+    global _VET_INDEX
+    if _VET_INDEX is not None or time.monotonic() < _state["next_retry_at"]:
+        return _VET_INDEX
+    if not _load_lock.acquire(blocking=False):
+        return None  # Another thread is already loading
+    try:
+        _state["status"] = "loading"
+        try:
+            if not _index_matches():
+                with file_lock(VET_INDEX_DIR):  # One worker builds; the others wait, then load its index
+                    if not _index_matches():
+                        # The dataset is only needed to (re)build; a built index is self-contained
+                        dataset = warm_vet_dataset()
+                        if dataset is None:
+                            # Loading elsewhere or backing off: don't retry before the dataset could be ready
+                            _state["status"] = "waiting_for_dataset"
+                            _state["next_retry_at"] = max(dataset_retry_at(), time.monotonic() + VET_INDEX_WAIT_SECONDS)
+                            return None
+                        started = time.monotonic()
+                        build_vet_index(dataset)
+                        _state["build_seconds"] = round(time.monotonic() - started, 3)
+            with file_lock(VET_INDEX_DIR, shared=True):  # Not while another worker swaps the directory
+                _VET_INDEX = VetIndex()
+        except Exception as exc:
+            _state.update(status="failed", last_error=f"{type(exc).__name__}: {exc}",
+                          next_retry_at=time.monotonic() + VET_INDEX_RETRY_SECONDS)
+            logging.getLogger(__name__).warning("Failed to load vet retrieval index: %s", exc)
+        else:
+            _state.update(status="ready", last_error=None)
+    finally:
+        _load_lock.release()
+    return _VET_INDEX
+
+
+def start_vet_index_warmup():
+    """Start `warm_vet_index()` in a daemon thread (returns immediately; no-op while one runs)."""
+    global _warmup_thread
+    if _VET_INDEX is not None or _load_lock.locked() or time.monotonic() < _state["next_retry_at"]:
+        return
+    if _warmup_thread is not None and _warmup_thread.is_alive():
+        return
+    _warmup_thread = threading.Thread(target=warm_vet_index, name="vet-index-warmup", daemon=True)
+    _warmup_thread.start()
+
+
+def get_vet_index() -> Optional[VetIndex]:
+    """Return the loaded index, or None (never blocks; starts a background warm-up if needed)."""
+    if _VET_INDEX is None:
+        start_vet_index_warmup()
+    return _VET_INDEX
+
+
+def retrieve_passages(query: str, k: int = VET_RETRIEVAL_TOP_K) -> List[str]:
+    """Top-k passages for `query`, or [] while the index isn't available."""
+    index = get_vet_index()
+    return index.search(query, k) if index is not None and k > 0 else []
+
+
+def vet_index_status() -> dict:
+    return {
+        **{key: v for key, v in _state.items() if key != "next_retry_at"},
+        "index_dir": VET_INDEX_DIR,
+        **({"meta": _VET_INDEX.meta} if _VET_INDEX is not None else {}),
+    }
@@ -10,25 +10,44 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   };
 
-  // Populate searchable breed datalist from API so the list stays in sync with the database
-  // Critical: `fetch('/api/breeds')` must return JSON with a `breeds` array of objects containing `breed_name_AKC`.
+  // Breed typeahead: as the user types, ask `/api/breeds/search` for the best few matches
+  // (names, word prefixes, aliases such as "Lab", and typo-tolerant fuzzy matches) and
+  // show them in the datalist. The static <option>s in index.html stay until the first
+  // results arrive, so the input still works as free text if the API is unavailable.
+  // Critical: `/api/breeds/search` must return JSON with a `breeds` array of objects containing `breed_name_AKC`.
   const breedInput = document.getElementById('breed_name');
   const breedDatalist = document.getElementById('breed_list');
   if (breedInput && breedDatalist) {
-    fetch('/api/breeds')
-      .then((response) => (response.ok ? response.json() : Promise.reject()))
-      .then((data) => {
-        const breeds = data?.breeds || [];
-        breeds.forEach((b) => {
-          // Initial use: add option.value as breed name so datalist suggestions map directly to input value
-          const option = document.createElement('option');
-          option.value = b.breed_name_AKC;
-          breedDatalist.appendChild(option);
-        });
-      })
-      .catch(() => {
-        // No-op fallback: leave input as free-text if API fails; users can still submit manually
+    let searchTimer = null;
+    let searchController = null;
+    const showSuggestions = (breeds) => {
+      const options = breeds.map((b) => {
+        const option = document.createElement('option');
+        option.value = b.breed_name_AKC;  // Selecting a suggestion fills in the official breed name
+        if (b.alias) option.label = `${b.alias} (${b.breed_name_AKC})`;
+        return option;
       });
+      breedDatalist.replaceChildren(...options);
+    };
+    const searchBreeds = async (query) => {
+      searchController?.abort();  // Only the latest keystroke's answer matters
+      searchController = new AbortController();
+      try {
+        const params = new URLSearchParams({ q: query, limit: '8' });
+        const response = await fetch(`/api/breeds/search?${params}`, { signal: searchController.signal });
+        if (!response.ok) return;
+        const data = await parseJson(response);
+        if (Array.isArray(data?.breeds) && data.breeds.length) showSuggestions(data.breeds);
+      } catch {
+        // Aborted or offline: keep the current suggestions
+      }
+    };
+    breedInput.addEventListener('input', () => {
+      const query = breedInput.value.trim();
+      clearTimeout(searchTimer);
+      if (!query) return;
+      searchTimer = setTimeout(() => searchBreeds(query), 120);  // Debounce fast typing
+    });
   }
 
   if (dogForm) {
@@ -47,32 +66,60 @@ document.addEventListener('DOMContentLoaded', () => {
         return;
       }
 
+      const aiResults = document.getElementById('aiQuestionsResult');
+      if (aiResults) aiResults.innerHTML = '';
+
+      // Stream AI questions over Server-Sent Events so each question shows up as soon as
+      // the model finishes its line. fetch() is used instead of EventSource because the
+      // request is a POST with a JSON body.
+      const appendQuestion = (text) => {
+        if (!aiResults) return;
+        const p = document.createElement('p');
+        p.textContent = text;
+        aiResults.appendChild(p);
+      };
+
       try {
-        const response = await fetch('/api/submit', {
+        const response = await fetch('/api/questions/ai/stream', {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
+            Accept: 'text/event-stream',
           },
           body: JSON.stringify(payload),
         });
 
-        if (response.ok) {
-          const result = await response.json();
-          const aiResults = document.getElementById('aiQuestionsResult');
-          if (aiResults) {
-            aiResults.innerHTML = '';
-            result.questions.forEach((q) => {
-              const p = document.createElement('p');
-              p.textContent = q;
-              aiResults.appendChild(p);
-            });
-          }
-        } else {
-          alert('Failed to submit the form. Please try again.');
+        if (!response.ok || !response.body) {
+          const result = await parseJson(response);
+          alert(result.detail ? `Error: ${result.detail}` : 'Failed to submit the form. Please try again.');
+          return;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+
+          // SSE messages are separated by a blank line; keep any partial message in the buffer
+          const messages = buffer.split('\n\n');
+          buffer = messages.pop();
+          messages.forEach((message) => {
+            const eventLine = message.split('\n').find((line) => line.startsWith('event:'));
+            const dataLine = message.split('\n').find((line) => line.startsWith('data:'));
+            if (!eventLine || !dataLine) return;
+            const eventName = eventLine.slice(6).trim();
+            const data = JSON.parse(dataLine.slice(5));
+            if (eventName === 'question') appendQuestion(data.text);
+            if (eventName === 'error') appendQuestion(`Sorry, AI questions are unavailable right now (${data.detail}).`);
+            // Server fell back to the preset questions (AI service unavailable or too slow)
+            if (eventName === 'done' && data.fallback) appendQuestion('AI questions are unavailable right now; these are general questions instead.');
+          });
         }
       } catch (error) {
         console.error('Submission error:', error);
-        const aiResults = document.getElementById('aiQuestionsResult');
         if (aiResults) aiResults.innerHTML = '<h3 class="ai-results-title">AI-Generated Vet Questions</h3><p class="ai-results-disclaimer">Three simple, educational questions to discuss with your veterinarian. This is informational only — not medical advice.</p><div class="ai-results-body">Failed to submit form. Please check your connection.</div>';
       }
     });